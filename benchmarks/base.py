@@ -0,0 +1,96 @@
+"""
+Общие помощники для бенчмарков.
+
+Каждый бенчмарк запускается из корня репозитория как обычный скрипт,
+например `python benchmarks/bench_follow_feed.py`, и работает
+на отдельной тестовой базе, которая удаляется после прогона.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(ROOT_DIR, 'yatube')
+
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_test_environment, teardown_test_environment
+)
+
+
+@contextmanager
+def test_database(on_disk=False):
+    """
+    Создаёт пустую тестовую базу на время бенчмарка.
+
+    SQLite по умолчанию создаёт тестовую базу в памяти; с on_disk=True
+    она лежит во временном файле, чтобы в неё могли писать
+    несколько потоков одновременно.
+    """
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    directory = None
+    if on_disk and connection.vendor == 'sqlite':
+        directory = tempfile.TemporaryDirectory()
+        test_settings['NAME'] = os.path.join(directory.name, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if directory is not None:
+            directory.cleanup()
+        teardown_test_environment()
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings):
+    return {
+        'runs': len(timings),
+        'min_ms': min(timings) * 1000,
+        'p50_ms': statistics.median(timings) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'max_ms': max(timings) * 1000,
+    }
+
+
+def measure(func, repeat=20, warmup=2):
+    """Запускает func несколько раз и возвращает сводку по времени."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def report(name, summary):
+    print(
+        f"{name:<40} "
+        f"p50 {summary['p50_ms']:9.2f} ms  "
+        f"p95 {summary['p95_ms']:9.2f} ms  "
+        f"p99 {summary['p99_ms']:9.2f} ms  "
+        f"({summary['runs']} runs)"
+    )
@@ -0,0 +1,95 @@
+"""
+Бенчмарк бэкендов кеша.
+
+Сравнивает LocMemCache, FileBasedCache и общий SQLiteCache: время
+основных операций в одном процессе и долю попаданий, когда несколько
+процессов (как воркеры gunicorn) читают ключи, записанные соседями.
+
+    python benchmarks/bench_cache.py --workers 4
+"""
+import argparse
+import os
+import tempfile
+from multiprocessing import get_context
+
+from base import measure, report
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from yatube.cache import SQLiteCache
+
+PAGE = 'x' * 20000
+
+
+def backends(directory):
+    return {
+        'LocMemCache': lambda: LocMemCache('bench', {}),
+        'FileBasedCache': lambda: FileBasedCache(
+            os.path.join(directory, 'files'), {}
+        ),
+        'SQLiteCache': lambda: SQLiteCache(
+            os.path.join(directory, 'cache.sqlite3'), {}
+        ),
+    }
+
+
+def worker(name, directory, number, workers, keys, queue, ready):
+    cache = backends(directory)[name]()
+    own = [f'key{i}' for i in range(keys) if i % workers == number]
+    cache.set_many({key: PAGE for key in own})
+    queue.put(None)
+    ready.wait()
+    found = cache.get_many([f'key{i}' for i in range(keys)])
+    queue.put(len(found))
+
+
+def hit_rate(name, directory, workers, keys):
+    """Доля ключей, которые воркер находит в кеше после записи всеми."""
+    context = get_context('fork')
+    queue, ready = context.Queue(), context.Event()
+    processes = [
+        context.Process(target=worker, args=(name, directory, number,
+                                             workers, keys, queue, ready))
+        for number in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        queue.get()
+    ready.set()
+    found = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return sum(found) / (keys * workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--keys', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, factory in backends(directory).items():
+            cache = factory()
+            cache.set_many({f'key{i}': PAGE for i in range(args.keys)})
+            cache.set('counter', 0)
+            page_keys = [f'key{i}' for i in range(10)]
+            report(f'{name}: set',
+                   measure(lambda: cache.set('key0', PAGE), args.repeat))
+            report(f'{name}: get',
+                   measure(lambda: cache.get('key1'), args.repeat))
+            report(f'{name}: get_many (10)',
+                   measure(lambda: cache.get_many(page_keys), args.repeat))
+            report(f'{name}: incr',
+                   measure(lambda: cache.incr('counter'), args.repeat))
+            cache.clear()
+            rate = hit_rate(name, directory, args.workers, args.keys)
+            print(f'{name}: попаданий в {args.workers} воркерах '
+                  f'{rate:.0%}')
+
+
+if __name__ == '__main__':
+    main()
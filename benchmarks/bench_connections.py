@@ -0,0 +1,137 @@
+"""
+Бенчмарк переиспользования соединений с базой.
+
+Нагружает страницы index и post (post_view) несколькими потоками
+через WSGIHandler — как воркер gunicorn с потоками, с сигналами
+начала и конца запроса, по которым Django закрывает соединения.
+Кеш выключен, чтобы каждый ответ ходил в базу. Сравниваются три
+режима:
+
+- per_request — CONN_MAX_AGE = 0, соединение на каждый запрос;
+- persistent — CONN_MAX_AGE > 0, своё соединение у каждого потока;
+- pool — бэкенд yatube.backends.*, общий пул воркера.
+
+На SQLite соединение открывается за доли миллисекунды; чтобы увидеть,
+что было бы с сетевым PostgreSQL, --connect-delay добавляет задержку
+к каждому новому соединению (TCP, TLS и аутентификация занимают
+единицы миллисекунд). На PostgreSQL (DB_ENGINE в окружении) задержка
+настоящая.
+
+    python benchmarks/bench_connections.py --clients 4 --connect-delay 5
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from base import summarize, test_database
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from posts.generator import Generator
+from posts.models import Post
+from yatube.backends.pool import get_pool
+
+VENDORS = {'sqlite': 'sqlite3', 'postgresql': 'postgresql'}
+
+
+def engines():
+    vendor = VENDORS[connection.vendor]
+    return f'django.db.backends.{vendor}', f'yatube.backends.{vendor}'
+
+
+def slow_connect(base, delay):
+    """Добавляет задержку к открытию соединения базового бэкенда."""
+    wrapper = load_backend(base).DatabaseWrapper
+    original = wrapper.get_new_connection
+
+    def get_new_connection(self, conn_params):
+        time.sleep(delay)
+        return original(self, conn_params)
+    wrapper.get_new_connection = get_new_connection
+    return lambda: setattr(wrapper, 'get_new_connection', original)
+
+
+def run(path, clients, requests):
+    handler = WSGIHandler()
+    environ = RequestFactory().get(path).environ
+    per_client = max(1, requests // clients)
+
+    def worker(number):
+        timings = []
+        try:
+            for _ in range(per_client):
+                started = time.perf_counter()
+                response = handler(dict(environ), lambda *args: None)
+                b''.join(response)
+                # конец ответа: request_finished закрывает или
+                # возвращает в пул соединение потока
+                response.close()
+                timings.append(time.perf_counter() - started)
+        finally:
+            connections['default'].close()
+        return timings
+
+    with ThreadPoolExecutor(clients) as pool:
+        return [timing for timings in pool.map(worker, range(clients))
+                for timing in timings]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=400,
+                        help='запросов на каждую страницу в каждом режиме')
+    parser.add_argument('--connect-delay', type=float, default=0,
+                        help='задержка открытия соединения, мс')
+    args = parser.parse_args()
+
+    with test_database(on_disk=True), override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+    }):
+        Generator(users=100, groups=10, posts=args.posts,
+                  comments=args.posts, follows=500, seed=1).generate()
+        post = Post.objects.select_related('author').first()
+        pages = {
+            'index': reverse('index'),
+            'post': reverse('post', args=[post.author.username, post.pk]),
+        }
+        base, pooled = engines()
+        restore = slow_connect(base, args.connect_delay / 1000)
+        settings_dict = connections.databases['default']
+        modes = {
+            'per_request': {'ENGINE': base, 'CONN_MAX_AGE': 0},
+            'persistent': {'ENGINE': base, 'CONN_MAX_AGE': 300},
+            'pool': {'ENGINE': pooled, 'CONN_MAX_AGE': 300,
+                     'POOL': {'SIZE': args.clients}},
+        }
+        original = {key: settings_dict.get(key) for key in
+                    ('ENGINE', 'CONN_MAX_AGE', 'POOL')}
+        print(f'{args.clients} потоков, {args.requests} запросов на страницу, '
+              f'база {connection.vendor}, задержка соединения '
+              f'{args.connect_delay} мс')
+        try:
+            for mode, options in modes.items():
+                settings_dict.update(options)
+                for name, path in pages.items():
+                    summary = summarize(run(path, args.clients,
+                                            args.requests))
+                    print(f"{mode:<12} {name:<6} "
+                          f"p50 {summary['p50_ms']:7.2f}  "
+                          f"p95 {summary['p95_ms']:7.2f}  "
+                          f"p99 {summary['p99_ms']:7.2f} ms")
+            stats = get_pool(connections['default']).stats
+            print(f'пул: {stats}')
+        finally:
+            settings_dict.update(original)
+            restore()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Бенчмарк потоковой выгрузки постов автора.
+
+Создаёт автора с N постами и комментариями к ним и замеряет скорость
+выгрузки в NDJSON и CSV (записей и мегабайт в секунду) и пиковую
+память Python во время выгрузки.
+
+    python benchmarks/bench_export.py --posts 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+from base import test_database
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from posts.export import FORMATS
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+BATCH = 10000
+
+
+def seed(posts, comments_per_post):
+    author = User.objects.create_user(username='author')
+    reader = User.objects.create_user(username='reader')
+    for start in range(0, posts, BATCH):
+        Post.objects.bulk_create(
+            Post(text=f'post {i} ' + 'текст ' * 30, author=author)
+            for i in range(start, min(posts, start + BATCH))
+        )
+    post_ids = Post.objects.values_list('pk', flat=True)
+    batch = []
+    for post_id in post_ids.iterator():
+        batch.extend(Comment(post_id=post_id, author=reader, text='ответ')
+                     for _ in range(comments_per_post))
+        if len(batch) >= BATCH:
+            Comment.objects.bulk_create(batch)
+            batch = []
+    Comment.objects.bulk_create(batch)
+    return author
+
+
+def consume(client, url, export_format):
+    response = client.get(url, {'format': export_format})
+    size = lines = 0
+    for chunk in response.streaming_content:
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+    return size, lines
+
+
+def run(client, url, export_format):
+    started = time.perf_counter()
+    size, lines = consume(client, url, export_format)
+    elapsed = time.perf_counter() - started
+    # память меряем отдельным проходом: tracemalloc сильно замедляет
+    tracemalloc.start()
+    consume(client, url, export_format)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{export_format:<7} {lines:9d} строк  {elapsed:7.2f} с  '
+          f'{lines / elapsed:9.0f} строк/с  '
+          f'{size / elapsed / 2 ** 20:6.1f} МБ/с  '
+          f'пик памяти {peak / 2 ** 20:6.1f} МБ')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments-per-post', type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database():
+        author = seed(args.posts, args.comments_per_post)
+        client = Client()
+        client.force_login(author)
+        url = reverse('export_posts', args=[author.username])
+        for export_format in FORMATS:
+            run(client, url, export_format)
+
+
+if __name__ == '__main__':
+    main()
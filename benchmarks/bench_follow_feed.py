@@ -0,0 +1,80 @@
+"""
+Бенчмарк гибридной ленты подписок.
+
+Сравнивает оба пути одного и того же автора с N подписчиками:
+раскладку поста по лентам при публикации и подмешивание постов
+«звезды» при чтении ленты.
+
+    python benchmarks/bench_follow_feed.py --followers 20000
+"""
+import argparse
+
+from base import measure, report, test_database
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+def seed(followers, authors, posts):
+    User.objects.bulk_create(
+        User(username=f'user{i}', password='!')
+        for i in range(followers + authors + 2)
+    )
+    users = list(User.objects.order_by('pk'))
+    star, reader, others = users[0], users[1], users[2:2 + authors]
+    readers = [reader] + users[2 + authors:]
+    Follow.objects.bulk_create(
+        [Follow(user=user, author=star) for user in readers]
+        + [Follow(user=reader, author=author) for author in others]
+    )
+    Post.objects.bulk_create(
+        (Post(text=f'post {i}', author=author)
+         for author in [star] + others for i in range(posts))
+    )
+    return star, reader, others
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--followers', type=int, default=5000)
+    parser.add_argument('--authors', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with test_database():
+        star, reader, others = seed(args.followers, args.authors, args.posts)
+        client = Client()
+        client.force_login(reader)
+        url = reverse('follow_index')
+
+        def publish():
+            Post.objects.create(text='bench', author=star)
+
+        def read():
+            client.get(url)
+
+        print(f'Автор с {args.followers} подписчиками, '
+              f'читатель подписан ещё на {args.authors} авторов')
+        for author in [star] + others:
+            timeline.backfill(reader.pk, author.pk)
+        report('fan-out on write: new post', measure(publish, args.repeat))
+        report('fan-out on write: read feed', measure(read, args.repeat))
+        # отметку ставит сигнал подписки, а подписки созданы bulk_create
+        UserStats.objects.update_or_create(
+            user=star, defaults={'merged_since': timezone.now()}
+        )
+        TimelineEntry.objects.filter(user=reader, post__author=star).delete()
+        report('merge on read: new post', measure(publish, args.repeat))
+        report('merge on read: read feed', measure(read, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Бенчмарк загрузки дампа: loaddata против import_dump.
+
+Заполняет тестовую базу через posts.generator, снимает dumpdata
+во временный файл и загружает его в пустую базу сначала loaddata,
+затем import_dump. Отдельно замеряет повторный import_dump того же
+файла — так стартует контейнер, когда дамп уже загружен.
+
+    python benchmarks/bench_import.py --posts 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+from io import StringIO
+
+from base import test_database
+
+from django.core.management import call_command
+
+from posts.generator import Generator
+from posts.models import ImportedDump
+
+APPS = ['auth.user', 'posts.group', 'posts.post', 'posts.comment',
+        'posts.follow']
+
+
+def timed(name, func, objects=None):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    line = f'{name:<28} {elapsed:8.2f} s'
+    if objects:
+        line += f'  {objects / max(elapsed, 1e-9):10.0f} объектов/с'
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=40000)
+    parser.add_argument('--follows', type=int, default=10000)
+    parser.add_argument('--skip-loaddata', action='store_true',
+                        help='не замерять loaddata (долго на больших дампах)')
+    args = parser.parse_args()
+
+    with test_database(), tempfile.TemporaryDirectory() as directory:
+        created = Generator(
+            users=args.users, groups=args.groups, posts=args.posts,
+            comments=args.comments, follows=args.follows, seed=1,
+        ).generate()
+        objects = sum(created[name] for name in
+                      ('users', 'groups', 'posts', 'comments', 'follows'))
+        path = os.path.join(directory, 'dump.json')
+        call_command('dumpdata', *APPS, output=path, verbosity=0)
+        size = os.path.getsize(path) / 1024 / 1024
+        print(f'Дамп: {objects} объектов, {size:.1f} МБ')
+
+        if not args.skip_loaddata:
+            call_command('flush', interactive=False, verbosity=0)
+            timed('loaddata', lambda: call_command(
+                'loaddata', path, verbosity=0
+            ), objects)
+        call_command('flush', interactive=False, verbosity=0)
+        timed('import_dump', lambda: call_command(
+            'import_dump', path, stdout=StringIO()
+        ), objects)
+        assert ImportedDump.objects.exists()
+        timed('import_dump (уже загружен)', lambda: call_command(
+            'import_dump', path, stdout=StringIO()
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""
+Нагрузочный бенчмарк всех страниц из posts.urls.
+
+Заполняет тестовую базу пользователями, группами, постами,
+комментариями и подписками (см. posts.generator), затем по очереди
+нагружает каждый маршрут несколькими одновременными клиентами
+и печатает пропускную способность, p50/p95/p99 и число запросов
+к базе на один ответ.
+С --output отчёт сохраняется в JSON, а с --compare сравнивается
+с отчётом, снятым раньше (например, на другом коммите).
+
+    python benchmarks/bench_load.py --clients 8 --output load.json
+    python benchmarks/bench_load.py --compare load.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from base import ROOT_DIR, summarize, test_database
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.generator import Generator
+from posts.models import Follow, Group, Post
+from posts.urls import urlpatterns
+
+User = get_user_model()
+
+WORDS = ['кот', 'собака', 'город', 'море', 'книга', 'музыка', 'лес',
+         'работа', 'поезд', 'погода', 'кофе', 'сад', 'река', 'снег']
+
+
+def text(rng, words=12):
+    return ' '.join(rng.choices(WORDS, k=words))
+
+
+def seed(args):
+    generator = Generator(
+        users=args.users, groups=args.groups, posts=args.posts,
+        comments=args.comments, follows=args.follows, seed=args.seed,
+    )
+    generator.generate()
+    # для поиска берём самые частые слова из текстов постов
+    return generator.vocabulary[:20]
+
+
+class Data:
+    """Что нужно сценариям: посты, группы и пользователи из базы."""
+
+    def __init__(self, words):
+        self.words = words
+        self.posts = list(Post.objects.values_list(
+            'author__username', 'pk', named=True
+        ).order_by())
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        self.users = list(User.objects.values_list('username', flat=True))
+        self.own = {}
+        for post in self.posts:
+            self.own.setdefault(post.author__username, []).append(post.pk)
+
+
+# Сценарий получает пользователя клиента, данные и генератор случайных
+# чисел и возвращает (подготовку или None, метод, адрес, данные формы).
+# Подготовка выполняется до замера.
+
+def get(name, *args, **params):
+    return None, 'get', reverse(name, args=args), params
+
+
+def own_post(user, data, rng):
+    return rng.choice(data.own[user.username])
+
+
+def random_post(data, rng):
+    post = rng.choice(data.posts)
+    return post.author__username, post.pk
+
+
+def other_user(user, data, rng):
+    username = rng.choice(data.users)
+    return username if username != user.username else data.users[0]
+
+
+def follow(user, data, rng):
+    username = other_user(user, data, rng)
+    author = User.objects.get(username=username)
+
+    def prepare():
+        Follow.objects.filter(user=user, author=author).delete()
+    return prepare, 'get', reverse('profile_follow', args=[username]), {}
+
+
+def unfollow(user, data, rng):
+    username = other_user(user, data, rng)
+    author = User.objects.get(username=username)
+
+    def prepare():
+        Follow.objects.get_or_create(user=user, author=author)
+    return prepare, 'get', reverse('profile_unfollow', args=[username]), {}
+
+
+SCENARIOS = {
+    'index': lambda user, data, rng: get('index'),
+    'follow_index': lambda user, data, rng: get('follow_index'),
+    'group_list': lambda user, data, rng: get('group_list'),
+    'user_list': lambda user, data, rng: get('user_list'),
+    'search': lambda user, data, rng: get('search', q=rng.choice(data.words)),
+    'group_posts': lambda user, data, rng: get(
+        'group_posts', rng.choice(data.groups)
+    ),
+    'profile': lambda user, data, rng: get(
+        'profile', rng.choice(data.users)
+    ),
+    'post': lambda user, data, rng: get('post', *random_post(data, rng)),
+    'new_post': lambda user, data, rng: (
+        None, 'post', reverse('new_post'), {'text': text(rng)}
+    ),
+    'post_edit': lambda user, data, rng: (
+        None, 'post',
+        reverse('post_edit', args=[user.username, own_post(user, data, rng)]),
+        {'text': text(rng)},
+    ),
+    'add_comment': lambda user, data, rng: (
+        None, 'post',
+        reverse('add_comment', args=random_post(data, rng)),
+        {'text': text(rng, 5)},
+    ),
+    'profile_follow': follow,
+    'profile_unfollow': unfollow,
+    # выгрузить свои посты может только сам автор
+    'export_posts': lambda user, data, rng: get(
+        'export_posts', user.username, format=rng.choice(['ndjson', 'csv'])
+    ),
+}
+
+
+def make_clients(data, count):
+    """Клиенты, вошедшие под разными авторами, у которых есть посты."""
+    authors = list(User.objects.filter(username__in=list(data.own))[:count])
+    clients = []
+    for user in authors:
+        client = Client()
+        client.force_login(user)
+        clients.append((client, user))
+    return clients
+
+
+def send(client, method, url, params):
+    """Выполняет запрос и возвращает код ответа или имя исключения."""
+    try:
+        response = getattr(client, method)(url, params)
+        if response.streaming:
+            # потоковый ответ делает запросы, пока его читают
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+    except Exception as error:
+        return type(error).__name__
+
+
+def run_route(name, clients, data, requests):
+    """Гоняет один маршрут всеми клиентами сразу."""
+    scenario = SCENARIOS[name]
+    per_client = max(1, requests // len(clients))
+
+    def worker(number):
+        client, user = clients[number]
+        rng = random.Random(f'{name}{number}')
+        results = []
+        try:
+            for _ in range(per_client):
+                prepare, method, url, params = scenario(user, data, rng)
+                if prepare is not None:
+                    prepare()
+                with CaptureQueriesContext(connections['default']) as queries:
+                    started = time.perf_counter()
+                    status = send(client, method, url, params)
+                    elapsed = time.perf_counter() - started
+                results.append((elapsed, len(queries), status))
+        finally:
+            connection.close()
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(len(clients)) as pool:
+        results = [row for rows in pool.map(worker, range(len(clients)))
+                   for row in rows]
+    wall = time.perf_counter() - started
+    timings = [elapsed for elapsed, _, _ in results]
+    queries = [count for _, count, _ in results]
+    errors = {}
+    for _, _, status in results:
+        if not isinstance(status, int) or status >= 400:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    summary = summarize(timings)
+    summary.update({
+        'throughput_rps': len(results) / wall,
+        'queries_mean': sum(queries) / len(queries),
+        'queries_max': max(queries),
+        'errors': errors,
+    })
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_route(name, summary, before=None):
+    line = (f"{name:<18} {summary['throughput_rps']:8.1f} rps  "
+            f"p50 {summary['p50_ms']:8.2f}  p95 {summary['p95_ms']:8.2f}  "
+            f"p99 {summary['p99_ms']:8.2f} ms  "
+            f"queries {summary['queries_mean']:5.1f}")
+    if before is not None:
+        line += (f"  | p95 {summary['p95_ms'] - before['p95_ms']:+8.2f} ms"
+                 f"  queries "
+                 f"{summary['queries_mean'] - before['queries_mean']:+5.1f}")
+    if summary['errors']:
+        line += f'  errors {summary["errors"]}'
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--follows', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='запросов на каждый маршрут')
+    parser.add_argument('--routes', nargs='*', default=list(SCENARIOS),
+                        choices=list(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='куда сохранить отчёт в JSON')
+    parser.add_argument('--compare', help='отчёт JSON для сравнения')
+    args = parser.parse_args()
+
+    missing = {p.name for p in urlpatterns} - set(SCENARIOS)
+    if missing:
+        parser.error(f'Нет сценариев для маршрутов: {sorted(missing)}')
+    before = {}
+    if args.compare:
+        with open(args.compare) as file:
+            before = json.load(file)['routes']
+
+    with test_database(on_disk=True):
+        data = Data(seed(args))
+        clients = make_clients(data, args.clients)
+        print(f'{args.users} пользователей, {args.posts} постов, '
+              f'{len(clients)} клиентов, {args.requests} запросов '
+              f'на маршрут, база {connection.vendor}')
+        routes = {}
+        for name in args.routes:
+            routes[name] = run_route(name, clients, data, args.requests)
+            print_route(name, routes[name], before.get(name))
+
+    if args.output:
+        report = {
+            'commit': git_commit(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'vendor': connection.vendor,
+            'params': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'compare')},
+            'routes': routes,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Бенчмарк накладных расходов MetricsMiddleware.
+
+Замеряет одни и те же страницы с middleware метрик и без него.
+
+    python benchmarks/bench_metrics.py --repeat 200
+"""
+import argparse
+
+from base import measure, report, test_database
+
+from django.contrib.auth import get_user_model
+from django.test import Client, modify_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=f'post {i}', author=author) for i in range(args.posts)
+        )
+        post = Post.objects.first()
+        client = Client()
+        pages = {
+            'index': reverse('index'),
+            'profile': reverse('profile', args=[author.username]),
+            'post': reverse('post', args=[author.username, post.pk]),
+        }
+        for name, url in pages.items():
+            with modify_settings(MIDDLEWARE={
+                'remove': 'yatube.metrics.MetricsMiddleware',
+            }):
+                report(f'{name}: without metrics',
+                       measure(lambda: client.get(url), args.repeat))
+            report(f'{name}: with metrics',
+                   measure(lambda: client.get(url), args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Бенчмарк полнотекстового поиска по постам.
+
+Заполняет таблицу постами из случайных слов и сравнивает поиск
+по индексу (первая страница и страница глубоко в выдаче)
+с прежним перебором text__icontains.
+
+    python benchmarks/bench_search.py --posts 1000000
+"""
+import argparse
+import random
+
+from base import measure, report, test_database
+
+from django.contrib.auth import get_user_model
+
+from posts.models import Post
+from posts.search import SearchPaginator
+
+User = get_user_model()
+
+BATCH = 10000
+
+
+def make_vocabulary(size, rng):
+    letters = 'абвгдеёжзийклмнопрстуфхцчшщэюя'
+    return [
+        ''.join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+        for _ in range(size)
+    ]
+
+
+def seed(posts, words, vocabulary, rng):
+    author = User.objects.create_user(username='author')
+    # частота слов по закону Ципфа, как в живом тексте
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    for start in range(0, posts, BATCH):
+        Post.objects.bulk_create(
+            Post(text=' '.join(rng.choices(vocabulary, weights, k=words)),
+                 author=author)
+            for _ in range(min(BATCH, posts - start))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--words', type=int, default=30)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    with test_database():
+        seed(args.posts, args.words, vocabulary, rng)
+        post_list = Post.objects.select_related('author', 'group')
+        print(f'{args.posts} постов по {args.words} слов')
+        queries = {
+            'frequent word': vocabulary[0],
+            'rare word': vocabulary[len(vocabulary) // 2],
+            'two words': f'{vocabulary[1]} {vocabulary[2]}',
+        }
+        for name, query in queries.items():
+            def first_page():
+                list(SearchPaginator(query, post_list, 10).page())
+
+            def deep_page():
+                paginator = SearchPaginator(query, post_list, 10)
+                page = paginator.page()
+                for _ in range(args.pages):
+                    if not page.has_next():
+                        break
+                    page = paginator.page(page.next_cursor)
+
+            def icontains():
+                list(post_list.filter(
+                    text__icontains=query.split()[0]
+                ).order_by('-pk')[:10])
+
+            report(f'{name}: fts first page',
+                   measure(first_page, args.repeat))
+            report(f'{name}: fts {args.pages} pages',
+                   measure(deep_page, max(1, args.repeat // 4)))
+            report(f'{name}: icontains first page',
+                   measure(icontains, max(1, args.repeat // 4)))
+
+
+if __name__ == '__main__':
+    main()
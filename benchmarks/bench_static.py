@@ -0,0 +1,62 @@
+"""
+Бенчмарк сборки статики с хешами и сжатыми копиями.
+
+Собирает всю статику проекта во временную папку collectstatic'ом
+с yatube.storage.CompressedManifestStaticFilesStorage: сжатие в один
+поток и во все потоки, затем повторная сборка без изменений.
+Печатает время и суммарный размер текстовых файлов до и после сжатия.
+
+    python benchmarks/bench_static.py
+"""
+import os
+import tempfile
+import time
+from io import StringIO
+
+from base import PROJECT_DIR  # noqa: F401
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from yatube import storage
+
+
+def collect():
+    started = time.perf_counter()
+    call_command('collectstatic', interactive=False, stdout=StringIO())
+    return time.perf_counter() - started
+
+
+def sizes(root):
+    totals = {'': 0, '.gz': 0, '.br': 0}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if not name.lower().endswith(storage.COMPRESSIBLE):
+                continue
+            path = os.path.join(directory, name)
+            for suffix in totals:
+                if os.path.exists(path + suffix):
+                    totals[suffix] += os.path.getsize(path + suffix)
+    return totals
+
+
+def main():
+    storage_class = storage.CompressedManifestStaticFilesStorage
+    for workers in (1, None):
+        storage_class.workers = workers
+        with tempfile.TemporaryDirectory() as root, \
+                override_settings(STATIC_ROOT=root):
+            elapsed = collect()
+            label = workers or f'{os.cpu_count()} (все процессоры)'
+            print(f'потоков сжатия {label}: {elapsed:.2f} s')
+            if workers is None:
+                print(f'повторная сборка без изменений: {collect():.2f} s')
+                totals = sizes(root)
+                print(f"текстовые файлы: {totals[''] / 1024:.0f} КБ, "
+                      f"gzip {totals['.gz'] / 1024:.0f} КБ, "
+                      f"brotli {totals['.br'] / 1024:.0f} КБ"
+                      + ('' if storage.brotli else ' (нет пакета Brotli)'))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,3 @@
 #!/bin/bash
-python manage.py collectstatic --noinput &&
-python manage.py migrate --noinput &&
-python manage.py loaddata dump.json &&
-gunicorn yatube.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+python manage.py boot --dump dump.json &&
+gunicorn yatube.wsgi:application --bind 0.0.0.0:8000 --workers 3 --threads 4
\ No newline at end of file
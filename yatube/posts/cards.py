@@ -0,0 +1,47 @@
+"""
+Кеш отрендеренных карточек постов.
+
+Кешируется только часть карточки, одинаковая для всех читателей.
+Ключ включает время последней правки поста и число комментариев,
+поэтому карточка пересобирается только когда меняется сам пост.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .thumbnails import attach_thumbnails, thumbnails_ready
+
+CARD_TEMPLATE = 'posts/includes/post_card_content.html'
+
+
+def card_key(post):
+    return 'post_card:{}:{}:{}:{}'.format(
+        post.pk,
+        post.modified.strftime('%Y%m%d%H%M%S%f'),
+        post.comments_count,
+        post.author.username,
+    )
+
+
+def attach_cards(posts):
+    """Подставляет постам готовый HTML карточек одним cache.get_many."""
+    posts = list(posts)
+    keys = {card_key(post): post for post in posts}
+    cached = cache.get_many(keys)
+    attach_thumbnails(
+        post for key, post in keys.items() if key not in cached
+    )
+    rendered = {}
+    for key, post in keys.items():
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {'post': post})
+            # карточку с исходной картинкой вместо миниатюры не кешируем,
+            # чтобы подхватить миниатюру, когда она будет готова
+            if thumbnails_ready(post):
+                rendered[key] = html
+        post.card_html = mark_safe(html)
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    return posts
@@ -0,0 +1,69 @@
+"""
+Валидаторы для условных GET-запросов к лентам и постам.
+
+ETag ленты собирается из её версии в кеше: версия меняется при
+публикации, правке и удалении поста и при каждом комментарии (см.
+posts.signals), поэтому сами посты ленты для ответа 304 не читаются.
+Кроме версии в ETag входят только строки, которые достаются по
+первичному ключу или индексу: счётчики автора профиля и подписки
+читателя. Главная страница отдаёт ETag своей закешированной копии
+(см. posts.cache.cache_feed).
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from .cache import (feed_version, group_scope, index_scope, make_etag,
+                    profile_scope)
+from .counters import USER_STATS_FIELDS
+from .models import Comment, Follow, Post
+
+User = get_user_model()
+
+STATS_FIELDS = [f'author__stats__{field}' for field in USER_STATS_FIELDS]
+
+
+def group_etag(request, slug):
+    return make_etag(request, feed_version(group_scope(slug)))
+
+
+def profile_etag(request, username):
+    stats = User.objects.filter(username=username).values_list(
+        *(f'stats__{field}' for field in USER_STATS_FIELDS)
+    )
+    return make_etag(
+        request,
+        feed_version(profile_scope(username)),
+        list(stats),
+    )
+
+
+def post_etag(request, username, post_id):
+    # последний комментарий берём подзапросом по индексу (post, created),
+    # а не через JOIN с GROUP BY
+    last_comment = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-created').values('created')[:1]
+    post = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).annotate(
+        last_comment=Subquery(last_comment)
+    ).order_by().values_list(
+        'modified', 'comments_count', 'last_comment', *STATS_FIELDS
+    )
+    return make_etag(request, list(post))
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    follows = Follow.objects.filter(user=request.user).aggregate(
+        count=Count('pk'), last=Max('pk')
+    )
+    # версия главной меняется при любом изменении любого поста,
+    # значит и при изменениях в ленте подписок
+    return make_etag(
+        request,
+        feed_version(index_scope()),
+        follows['count'],
+        follows['last'],
+    )
@@ -0,0 +1,91 @@
+"""
+Денормализованные счётчики.
+
+Счётчики меняются одним атомарным UPDATE ... SET x = x + 1 в момент
+записи, поэтому страницы читают готовые числа вместо COUNT(*).
+Расхождения, если они всё же накопятся, исправляет команда
+reconcile_user_stats.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+USER_STATS_FIELDS = ('followers_count', 'following_count', 'posts_count')
+
+
+def count_user_stats(user_id):
+    return {
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+    }
+
+
+def get_user_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user.pk, defaults=count_user_stats(user.pk)
+        )
+        return stats
+
+
+def change_user_stats(user_id, field, delta):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        # не уходим в минус, если счётчик уже разошёлся с данными
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    stats.update(**{field: F(field) + delta})
+
+
+def reconcile_user_stats():
+    """Пересчитывает счётчики всех пользователей, возвращает число правок."""
+    counted = {
+        'followers_count': Follow.objects.values_list('author_id'),
+        'following_count': Follow.objects.values_list('user_id'),
+        'posts_count': Post.objects.values_list('author_id'),
+    }
+    actual = {}
+    for field, queryset in counted.items():
+        rows = queryset.order_by().annotate(total=Count('id'))
+        for user_id, total in rows.iterator():
+            actual.setdefault(user_id, dict.fromkeys(USER_STATS_FIELDS, 0))
+            actual[user_id][field] = total
+    existing = UserStats.objects.in_bulk()
+    missing = [
+        UserStats(user_id=user_id,
+                  **actual.get(user_id, dict.fromkeys(USER_STATS_FIELDS, 0)))
+        for user_id in User.objects.values_list('pk', flat=True).iterator()
+        if user_id not in existing
+    ]
+    changed = []
+    for user_id, stats in existing.items():
+        values = actual.get(user_id, dict.fromkeys(USER_STATS_FIELDS, 0))
+        if any(getattr(stats, f) != values[f] for f in USER_STATS_FIELDS):
+            for field in USER_STATS_FIELDS:
+                setattr(stats, field, values[field])
+            changed.append(stats)
+    UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+    UserStats.objects.bulk_update(changed, USER_STATS_FIELDS, batch_size=500)
+    return len(missing) + len(changed)
+
+
+def change_comments_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+
+def repair_comment_counts():
+    """Пересчитывает число комментариев всех постов одним UPDATE."""
+    counted = (Comment.objects.filter(post=OuterRef('pk')).order_by()
+               .values('post').annotate(total=Count('id')).values('total'))
+    return Post.objects.update(
+        comments_count=Coalesce(Subquery(counted), 0)
+    )
@@ -0,0 +1,112 @@
+"""
+Потоковая выгрузка постов автора с комментариями.
+
+Посты и комментарии читаются двумя курсорами (на PostgreSQL —
+серверными) кусками по CHUNK_SIZE строк, оба в одном порядке
+постов, и сливаются на лету: за каждым постом идут его комментарии.
+В памяти одновременно лежит не больше пары кусков, сколько бы постов
+ни было у автора.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+# строки отдаём кусками примерно такого размера: по одной строке
+# накладные расходы WSGI-сервера на кусок заметнее самой выгрузки
+BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_FIELDS = ['type', 'id', 'post_id', 'author', 'text', 'created',
+              'group', 'image_url', 'comments_count']
+
+POST_ORDERING = ('-pub_date', '-pk')
+COMMENT_ORDERING = ('-post__pub_date', '-post_id', 'created', 'pk')
+
+
+def export_records(author, image_url=lambda url: url):
+    """Записи выгрузки: пост, затем его комментарии, и так далее."""
+    storage = Post._meta.get_field('image').storage
+    posts = Post.objects.filter(author=author).order_by(
+        *POST_ORDERING
+    ).values_list(
+        'pk', 'text', 'pub_date', 'group__slug', 'image', 'comments_count'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    comments = Comment.objects.filter(post__author=author).order_by(
+        *COMMENT_ORDERING
+    ).values_list(
+        'post__pub_date', 'post_id', 'pk', 'author__username', 'text',
+        'created'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    comment = next(comments, None)
+    for pk, text, pub_date, group, image, comments_count in posts:
+        yield {
+            'type': 'post',
+            'id': pk,
+            'author': author.username,
+            'text': text,
+            'created': pub_date,
+            'group': group,
+            'image_url': image_url(storage.url(image)) if image else None,
+            'comments_count': comments_count,
+        }
+        # комментарии идут в том же порядке постов, что и сами посты;
+        # комментарии к постам, которых нет в выборке (пост появился
+        # между двумя запросами), пропускаем
+        while comment is not None and comment[:2] > (pub_date, pk):
+            comment = next(comments, None)
+        while comment is not None and comment[:2] == (pub_date, pk):
+            _, post_id, comment_pk, username, comment_text, created = comment
+            yield {
+                'type': 'comment',
+                'id': comment_pk,
+                'post_id': post_id,
+                'author': username,
+                'text': comment_text,
+                'created': created,
+            }
+            comment = next(comments, None)
+
+
+def as_ndjson(records):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for record in records:
+        yield encoder.encode(record) + '\n'
+
+
+class Echo:
+    """Файл для csv.writer, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def as_csv(records):
+    writer = csv.DictWriter(Echo(), CSV_FIELDS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_lines(author, export_format, image_url=lambda url: url):
+    records = export_records(author, image_url)
+    if export_format == 'csv':
+        return buffered(as_csv(records))
+    return buffered(as_ndjson(records))
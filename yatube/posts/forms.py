@@ -1,5 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
 from .models import Comment, Post
+from .uploads import process_image
 
 
 class PostForm(forms.ModelForm):
@@ -17,6 +20,13 @@ class PostForm(forms.ModelForm):
             "image": "Изображение"
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get("image")
+        # пережимаем только новую загрузку, а не уже сохранённый файл
+        if isinstance(image, UploadedFile):
+            return process_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,304 @@
+"""
+Генератор больших наборов данных для проверки лент под нагрузкой.
+
+Пользователи, группы, посты, комментарии и подписки создаются
+с перекосом, как в живом сервисе: число постов у автора, подписчиков
+у автора и комментариев у поста распределены по закону Ципфа.
+Строки пишутся пачками мимо ORM: на PostgreSQL через COPY,
+на остальных базах через executemany. Результат полностью
+определяется параметром seed: даты отсчитываются от BASE_DATE,
+а не от текущего времени, и у всех пользователей один хеш пароля
+с солью из seed.
+
+Сигналы моделей при этом не срабатывают, поэтому счётчики
+пользователей и число комментариев у постов считаются здесь же,
+а ленты подписок и поисковый индекс собираются в конце целиком.
+"""
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from faker import Faker
+
+from . import search, timeline
+from .bulk import Writer
+from .models import (Comment, Follow, Group, Post, TimelineEntry,
+                     UserStats)
+
+User = get_user_model()
+
+VOCABULARY_SIZE = 5000
+
+# последний пост набора публикуется в этот момент
+BASE_DATE = datetime(2021, 1, 1)
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class Generator:
+    """
+    Создаёт набор данных и возвращает число строк по таблицам.
+
+    Новые записи получают id после уже существующих, так что
+    генератор можно запускать и на непустой базе. Если там уже есть
+    пользователь user{id} или группа group{id} с одним из новых id,
+    generate отказывается работать с ValueError.
+    """
+
+    def __init__(self, users, groups, posts, comments, follows, seed=0,
+                 exponent=1.1, days=365, batch_size=10000, password=None,
+                 log=None):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.exponent = exponent
+        self.days = days
+        self.batch_size = batch_size
+        # один хеш на всех, и соль не случайная, чтобы строки
+        # пользователей не менялись от запуска к запуску
+        self.password = (make_password(password, salt=f'generated{seed}')
+                         if password is not None
+                         else UNUSABLE_PASSWORD_PREFIX)
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.now = BASE_DATE
+        self.vocabulary = list({
+            word.lower() for word in
+            self.faker.words(VOCABULARY_SIZE, unique=False)
+        })
+        self.vocabulary.sort()
+        self.rng.shuffle(self.vocabulary)
+        self.word_weights = zipf_weights(len(self.vocabulary), 1.0)
+
+    def text(self, low, high):
+        words = self.rng.choices(self.vocabulary,
+                                 cum_weights=self.word_weights,
+                                 k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize()
+
+    def ranked(self, first_id, count):
+        """Id по убыванию популярности: у кого выше ранг, тем больше веса."""
+        ids = list(range(first_id, first_id + count))
+        self.rng.shuffle(ids)
+        return ids, zipf_weights(count, self.exponent)
+
+    def writer(self, model, *fields):
+        return Writer(model, fields, self.batch_size)
+
+    def phase(self, name, func):
+        started = time.perf_counter()
+        rows = func()
+        elapsed = time.perf_counter() - started
+        if rows is None:
+            self.log(f'{name}: {elapsed:.1f} с')
+        else:
+            self.log(f'{name}: {rows} строк за {elapsed:.1f} с '
+                     f'({rows / max(elapsed, 1e-9):.0f} строк/с)')
+        return rows
+
+    def generate(self):
+        self.user_id = next_id(User)
+        self.group_id = next_id(Group)
+        self.post_id = next_id(Post)
+        taken = self.taken_names()
+        if taken:
+            raise ValueError('Имена уже заняты: ' + ', '.join(taken[:10]))
+        self.stats = {
+            'followers_count': [0] * self.users,
+            'following_count': [0] * self.users,
+            'posts_count': [0] * self.users,
+        }
+        created = {}
+        created['users'] = self.phase('Пользователи', self.write_users)
+        created['groups'] = self.phase('Группы', self.write_groups)
+        created['follows'] = self.phase('Подписки', self.write_follows)
+        created['stats'] = self.phase('Счётчики', self.write_stats)
+        with connection.schema_editor() as schema_editor:
+            # индекс поиска дешевле собрать один раз в конце,
+            # чем обновлять триггером на каждый пост
+            search.drop_index(schema_editor)
+        try:
+            created['posts'] = self.phase('Посты', self.write_posts)
+            created['comments'] = self.phase('Комментарии',
+                                             self.write_comments)
+        finally:
+            # без индекса поиск не работает, поэтому возвращаем его,
+            # даже если запись оборвалась
+            with connection.schema_editor() as schema_editor:
+                self.phase('Поисковый индекс',
+                           lambda: search.create_index(schema_editor))
+        self.phase('Ленты подписок', self.write_timelines)
+        self.reset_sequences()
+        return created
+
+    def taken_names(self):
+        """Имена user{id} и group{id} новых записей, которые уже есть."""
+        names = {
+            (User, 'username'): [f'user{pk}' for pk in range(
+                self.user_id, self.user_id + self.users
+            )],
+            (Group, 'slug'): [f'group{pk}' for pk in range(
+                self.group_id, self.group_id + self.groups
+            )],
+        }
+        taken = []
+        for (model, field), values in names.items():
+            for start in range(0, len(values), self.batch_size):
+                taken += model.objects.filter(**{
+                    f'{field}__in': values[start:start + self.batch_size]
+                }).order_by(field).values_list(field, flat=True)
+        return taken
+
+    def write_users(self):
+        writer = self.writer(User, 'id', 'password', 'is_superuser',
+                             'username', 'first_name', 'last_name', 'email',
+                             'is_staff', 'is_active', 'date_joined')
+        names = [(self.faker.first_name(), self.faker.last_name())
+                 for _ in range(min(self.users, 1000))]
+        for number in range(self.users):
+            pk = self.user_id + number
+            first_name, last_name = names[number % len(names)]
+            joined = self.now - timedelta(
+                seconds=self.rng.randrange(self.days * 86400)
+            )
+            writer.add(pk, self.password, False, f'user{pk}', first_name,
+                       last_name, f'user{pk}@example.com', False, True,
+                       joined)
+        writer.flush()
+        return writer.written
+
+    def write_groups(self):
+        writer = self.writer(Group, 'id', 'title', 'slug', 'description')
+        for number in range(self.groups):
+            pk = self.group_id + number
+            writer.add(pk, self.faker.catch_phrase()[:200], f'group{pk}',
+                       self.text(5, 30))
+        writer.flush()
+        return writer.written
+
+    def write_follows(self):
+        if self.users < 2:
+            return 0
+        writer = self.writer(Follow, 'user', 'author')
+        authors, weights = self.ranked(self.user_id, self.users)
+        average = self.follows / self.users
+        for number in range(self.users):
+            user_id = self.user_id + number
+            wanted = min(self.users - 1,
+                         round(self.rng.expovariate(1 / average))
+                         if average else 0)
+            # популярных авторов выбирают чаще, повторы отбрасываем
+            chosen = set()
+            for _ in range(wanted * 3):
+                if len(chosen) >= wanted:
+                    break
+                author_id = self.rng.choices(authors, cum_weights=weights)[0]
+                if author_id != user_id:
+                    chosen.add(author_id)
+            for author_id in sorted(chosen):
+                writer.add(user_id, author_id)
+                self.stats['following_count'][number] += 1
+                self.stats['followers_count'][author_id - self.user_id] += 1
+        writer.flush()
+        return writer.written
+
+    def write_stats(self):
+        # счётчик постов допишем после постов, сейчас строки нужны
+        # для того, чтобы ленты знали, кто из авторов «звезда»
+        self.post_authors = self.pick_post_authors()
+        for author_id in self.post_authors:
+            self.stats['posts_count'][author_id - self.user_id] += 1
+        writer = self.writer(UserStats, 'user', 'followers_count',
+                             'following_count', 'posts_count')
+        for number in range(self.users):
+            writer.add(self.user_id + number,
+                       self.stats['followers_count'][number],
+                       self.stats['following_count'][number],
+                       self.stats['posts_count'][number])
+        writer.flush()
+        return writer.written
+
+    def pick_post_authors(self):
+        if not self.users:
+            return []
+        authors, weights = self.ranked(self.user_id, self.users)
+        return self.rng.choices(authors, cum_weights=weights, k=self.posts)
+
+    def write_posts(self):
+        if not self.post_authors:
+            return 0
+        writer = self.writer(Post, 'id', 'text', 'pub_date', 'modified',
+                             'author', 'group', 'image', 'comments_count')
+        group_ids, group_weights = self.ranked(self.group_id, self.groups)
+        self.comment_posts = self.pick_comment_posts()
+        comments_count = [0] * self.posts
+        for post_id in self.comment_posts:
+            comments_count[post_id - self.post_id] += 1
+        span = self.days * 86400
+        for number, author_id in enumerate(self.post_authors):
+            # id растут вместе с датой, как у постов, созданных по очереди
+            pub_date = self.now - timedelta(
+                seconds=span * (self.posts - number) / self.posts
+            )
+            group_id = None
+            if group_ids and self.rng.random() < 0.4:
+                group_id = self.rng.choices(group_ids,
+                                            cum_weights=group_weights)[0]
+            writer.add(self.post_id + number, self.text(5, 60), pub_date,
+                       pub_date, author_id, group_id, None,
+                       comments_count[number])
+        writer.flush()
+        return writer.written
+
+    def pick_comment_posts(self):
+        if not self.posts:
+            return []
+        posts, weights = self.ranked(self.post_id, self.posts)
+        return self.rng.choices(posts, cum_weights=weights, k=self.comments)
+
+    def write_comments(self):
+        writer = self.writer(Comment, 'post', 'author', 'text', 'created')
+        span = self.days * 86400
+        for post_id in self.comment_posts:
+            offset = (self.posts - (post_id - self.post_id)) * span
+            created = self.now - timedelta(
+                seconds=self.rng.uniform(0, offset / self.posts)
+            )
+            writer.add(post_id,
+                       self.rng.randrange(self.user_id,
+                                          self.user_id + self.users),
+                       self.text(3, 25), created)
+        writer.flush()
+        return writer.written
+
+    def write_timelines(self):
+        with transaction.atomic():
+            timeline.rebuild()
+        return TimelineEntry.objects.count()
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment, Follow]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
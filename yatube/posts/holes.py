@@ -0,0 +1,47 @@
+"""
+Персональные «дырки» в общих закешированных страницах.
+
+Страница рендерится один раз для всех читателей: вместо блоков,
+которые зависят от пользователя (меню, кнопки под постом, имя в шапке),
+в неё попадают метки с именем шаблона и его параметрами. Перед отдачей
+метки заменяются шаблонами, отрендеренными для текущего пользователя.
+"""
+import base64
+import json
+import re
+
+from django.template import Context, engines
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+TEMPLATE = 'posts/includes/holes/{}.html'
+MARKER = '<!--hole:{}:{}-->'
+MARKER_RE = re.compile(r'<!--hole:(\w+):([\w=-]*)-->')
+
+
+def is_skeleton(request):
+    return getattr(request, 'render_skeleton', False)
+
+
+def make_marker(name, params):
+    data = base64.urlsafe_b64encode(json.dumps(params).encode())
+    return mark_safe(MARKER.format(name, data.decode()))
+
+
+def render_hole(name, context, params):
+    template = get_template(TEMPLATE.format(name))
+    with context.push(**params):
+        return template.template.render(context)
+
+
+def fill_holes(content, request):
+    """Заменяет метки в странице блоками для текущего пользователя."""
+    # процессоры контекста (user и т.п.) выполняются один раз на страницу
+    context = Context()
+    for processor in engines['django'].engine.template_context_processors:
+        context.update(processor(request))
+
+    def fill(match):
+        params = json.loads(base64.urlsafe_b64decode(match.group(2)))
+        return render_hole(match.group(1), context, params)
+    return MARKER_RE.sub(fill, content)
@@ -0,0 +1,215 @@
+"""
+Потоковая загрузка дампа dumpdata вместо loaddata.
+
+loaddata читает весь JSON в память и сохраняет объекты по одному.
+Здесь дамп читается кусками и разбирается по одному объекту, строки
+копятся по таблицам и пишутся пачками через Writer: на PostgreSQL
+через COPY, на остальных базах через executemany. Всё идёт одной
+транзакцией; внешние ключи в обеих базах проверяются при коммите,
+поэтому порядок моделей в дампе не важен.
+
+Индексы из Meta.indexes и поисковый индекс у таблиц, которые были
+пустыми, снимаются на время загрузки и строятся один раз в конце.
+Строки, которые уже есть в базе, не перезаписываются.
+
+Каждый загруженный дамп запоминается по sha256 содержимого
+(ImportedDump), и тот же файл второй раз не загружается: повторный
+запуск при старте контейнера стоит одного чтения файла.
+Сигналы моделей не срабатывают, поэтому счётчики пользователей,
+число комментариев у постов и ленты подписок пересчитываются в конце.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from django.core.management.color import no_style
+from django.core.serializers.python import Deserializer
+from django.db import connection, transaction
+
+from . import search, timeline
+from .bulk import Writer
+from .counters import reconcile_user_stats, repair_comment_counts
+from .models import ImportedDump, Post
+
+READ_SIZE = 64 * 1024
+BATCH_SIZE = 5000
+# между объектами верхнего уровня: скобки массива, запятые и пробелы
+SEPARATORS = frozenset(' \t\r\n[],')
+
+
+def open_dump(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_objects(stream, read_size=READ_SIZE):
+    """Объекты из JSON-массива по одному, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if position == len(buffer):
+            if eof:
+                return
+            buffer, position = stream.read(read_size), 0
+            eof = not buffer
+            continue
+        try:
+            obj, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # объект не поместился в буфер целиком: дочитываем
+            if eof:
+                raise
+            more = stream.read(read_size)
+            eof = not more
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield obj
+
+
+def batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prepared(obj, field):
+    value = getattr(obj, field.attname)
+    if value is None and (getattr(field, 'auto_now', False)
+                          or getattr(field, 'auto_now_add', False)):
+        # в старых дампах нет полей, добавленных позже, — заполняем
+        # их так же, как заполнил бы save()
+        value = field.pre_save(obj, True)
+    return field.get_db_prep_save(value, connection)
+
+
+class Importer:
+    """
+    Загружает дамп и возвращает число объектов по моделям
+    или None, если этот дамп уже загружен.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE, force=False,
+                 read_size=READ_SIZE, log=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.force = force
+        self.read_size = read_size
+        self.log = log or (lambda message: None)
+
+    def phase(self, name, func):
+        started = time.perf_counter()
+        result = func()
+        self.log(f'{name}: {time.perf_counter() - started:.1f} с')
+        return result
+
+    def run(self):
+        self.fingerprint = self.phase('Отпечаток',
+                                      lambda: fingerprint(self.path))
+        if (not self.force and ImportedDump.objects.filter(
+                fingerprint=self.fingerprint).exists()):
+            self.log('Дамп уже загружен, пропускаем')
+            return None
+        self.writers = {}
+        self.deferred = []
+        self.counts = {}
+        self.editor = connection.schema_editor()
+        with transaction.atomic():
+            self.phase('Объекты', self.load)
+            self.phase('Индексы', self.restore_indexes)
+            self.phase('Проверка ключей', self.check)
+            self.phase('Счётчики и ленты', self.rebuild)
+            ImportedDump.objects.update_or_create(
+                fingerprint=self.fingerprint,
+                defaults={'name': os.path.basename(self.path),
+                          'object_count': sum(self.counts.values())},
+            )
+        return self.counts
+
+    def load(self):
+        with open_dump(self.path) as stream:
+            objects = iter_objects(stream, self.read_size)
+            for batch in batches(objects, self.batch_size):
+                for item in Deserializer(batch):
+                    self.add(item.object, item.m2m_data)
+        for writer in self.writers.values():
+            writer.flush()
+
+    def writer(self, model, fields):
+        writer = self.writers.get(model)
+        if writer is None:
+            self.defer_indexes(model)
+            writer = self.writers[model] = Writer(
+                model, [field.name for field in fields], self.batch_size,
+                ignore_conflicts=True,
+            )
+        return writer
+
+    def add(self, obj, m2m_data):
+        model = type(obj)
+        fields = model._meta.local_concrete_fields
+        self.writer(model, fields).add_prepared(
+            [prepared(obj, field) for field in fields]
+        )
+        label = model._meta.label
+        self.counts[label] = self.counts.get(label, 0) + 1
+        for name, values in (m2m_data or {}).items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            writer = self.writer(through, [
+                through._meta.get_field(field.m2m_field_name()),
+                through._meta.get_field(field.m2m_reverse_field_name()),
+            ])
+            for value in values:
+                writer.add_prepared([obj.pk, value])
+
+    def defer_indexes(self, model):
+        """Снимает индексы таблицы, если она пуста: построим их в конце."""
+        if model._default_manager.exists():
+            return
+        for index in model._meta.indexes:
+            self.editor.execute(index.remove_sql(model, self.editor))
+            self.deferred.append((model, index))
+        if model is Post:
+            search.drop_index(self.editor)
+            self.deferred.append((model, None))
+
+    def restore_indexes(self):
+        for model, index in self.deferred:
+            if index is None:
+                search.create_index(self.editor)
+            else:
+                self.editor.execute(index.create_sql(model, self.editor))
+
+    def check(self):
+        models = list(self.writers)
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in models]
+        )
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def rebuild(self):
+        # сигналы не срабатывали, поэтому счётчики и ленты пересчитываем
+        reconcile_user_stats()
+        repair_comment_counts()
+        timeline.rebuild()
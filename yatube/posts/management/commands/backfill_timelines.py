@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Раскладывает по лентам посты авторов, у которых подписчиков '
+            'снова не больше TIMELINE_FANOUT_LIMIT')
+
+    def handle(self, *args, **options):
+        finished = timeline.finish_merging()
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов разложено: {finished}'
+        ))
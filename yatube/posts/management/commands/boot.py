@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from yatube.boot import boot
+
+
+class Command(BaseCommand):
+    help = ('Готовит контейнер к старту: collectstatic, migrate и, если '
+            'указан дамп, import_dump; шаги без изменений пропускаются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dump', help='Дамп для import_dump')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Выполнить все шаги, даже если всё уже сделано',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        boot(dump=options['dump'], force=options['force'],
+             log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.2f} с'
+        ))
@@ -0,0 +1,63 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import delete
+
+from posts.models import Post
+
+
+def walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for name in directories:
+        yield from walk(storage, os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=60,
+            help='Не трогать файлы моложе стольких минут: их пост может '
+                 'ещё сохраняться',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        directory = field.upload_to.rstrip('/')
+        if not storage.exists(directory):
+            return
+        referenced = set(
+            Post.objects.exclude(image='').exclude(image=None)
+            .values_list('image', flat=True)
+        )
+        deadline = timezone.now() - timedelta(minutes=options['grace'])
+        removed = 0
+        for name in walk(storage, directory):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > deadline:
+                continue
+            if options['dry_run']:
+                self.stdout.write(name)
+            elif Post.objects.filter(image=name).exists():
+                # на файл сослался пост, сохранённый уже после
+                # выборки referenced
+                continue
+            else:
+                # вместе с файлом удаляются его миниатюры и записи sorl
+                delete(Post(image=name).image)
+            removed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Неиспользуемых картинок: {removed}'
+        ))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FORMATS, export_lines
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты автора с комментариями в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=list(FORMATS),
+                            default='ndjson')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--base-url', default='',
+            help='Адрес сайта, с которым ссылки на картинки будут полными',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        base_url = options['base_url'].rstrip('/')
+        lines = export_lines(author, options['format'],
+                             lambda url: base_url + url)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.generator import Generator
+
+
+class Command(BaseCommand):
+    help = ('Быстро создаёт много пользователей, групп, постов, '
+            'комментариев и подписок с распределением по Ципфу')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='С одним и тем же seed получаются одни и те же данные',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель закона Ципфа: чем больше, тем сильнее перекос',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней разложить посты',
+        )
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--password',
+            help='Пароль всех созданных пользователей; без него войти '
+                 'под ними нельзя',
+        )
+
+    def handle(self, *args, **options):
+        generator = Generator(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            seed=options['seed'],
+            exponent=options['exponent'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            password=options['password'],
+            log=self.stdout.write,
+        )
+        try:
+            created = generator.generate()
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: ' + ', '.join(
+                f'{name} {count}' for name, count in created.items()
+            )
+        ))
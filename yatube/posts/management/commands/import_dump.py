@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import BATCH_SIZE, Importer
+
+
+class Command(BaseCommand):
+    help = ('Загружает дамп dumpdata (JSON или JSON.gz) пачками; '
+            'уже загруженный дамп пропускает')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Загрузить, даже если этот дамп уже загружали',
+        )
+
+    def handle(self, *args, **options):
+        importer = Importer(options['path'],
+                            batch_size=options['batch_size'],
+                            force=options['force'],
+                            log=self.stdout.write)
+        try:
+            counts = importer.run()
+        except OSError as error:
+            raise CommandError(error)
+        if counts is None:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            'Загружено: ' + ', '.join(
+                f'{label} {count}' for label, count in counts.items()
+            )
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.search import create_index, drop_index
+
+
+class Command(BaseCommand):
+    help = ('Пересоздаёт полнотекстовый индекс постов, например после '
+            'миграции, которая пересобрала таблицу posts_post')
+
+    def handle(self, *args, **options):
+        with connection.schema_editor() as schema_editor:
+            drop_index(schema_editor)
+            create_index(schema_editor)
+        self.stdout.write(self.style.SUCCESS('Индекс поиска пересоздан'))
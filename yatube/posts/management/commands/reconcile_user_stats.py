@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import reconcile_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики подписчиков, подписок и постов с данными'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = reconcile_user_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {fixed}'
+        ))
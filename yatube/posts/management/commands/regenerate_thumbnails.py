@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from sorl.thumbnail import default
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+def regenerate(name, force=False):
+    # файл привязываем к полю модели, чтобы миниатюры искались
+    # в том же хранилище, что и при рендеринге ленты
+    image = Post(image=name).image
+    if force:
+        default.backend.delete(image, delete_file=False)
+    generate_thumbnails(image)
+    return name
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры всех размеров для картинок всех постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Сколько процессов режут картинки параллельно',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать и уже существующие миниатюры',
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='')
+            .order_by().values_list('image', flat=True).distinct()
+        )
+        if options['processes'] > 1:
+            # дочерние процессы не должны делить соединения с родителем
+            connections.close_all()
+            with ProcessPoolExecutor(options['processes']) as executor:
+                done = list(executor.map(
+                    regenerate, names, [options['force']] * len(names),
+                    chunksize=16,
+                ))
+        else:
+            done = [regenerate(name, options['force']) for name in names]
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {len(done)}'
+        ))
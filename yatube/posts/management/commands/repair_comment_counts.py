@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import repair_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает число комментариев у всех постов'
+
+    def handle(self, *args, **options):
+        updated = repair_comment_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {updated}'
+        ))
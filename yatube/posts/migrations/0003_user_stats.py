@@ -0,0 +1,57 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    # по подзапросу на счётчик: несколько Count в одном запросе
+    # перемножают строки подписок и постов
+    def counted(model, field):
+        return Coalesce(models.Subquery(
+            model.objects.filter(**{field: models.OuterRef('pk')})
+            .order_by().values(field).annotate(total=models.Count('id'))
+            .values('total')
+        ), 0)
+
+    UserStats.objects.bulk_create(
+        UserStats(
+            user_id=user.pk,
+            followers_count=user.followers_count,
+            following_count=user.following_count,
+            posts_count=user.posts_count,
+        )
+        for user in User.objects.annotate(
+            followers_count=counted(Follow, 'author'),
+            following_count=counted(Follow, 'user'),
+            posts_count=counted(Post, 'author'),
+        ).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0002_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:33
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_comments_count(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    counted = (Comment.objects.filter(post=models.OuterRef('pk')).order_by()
+               .values('post').annotate(total=models.Count('id'))
+               .values('total'))
+    Post.objects.update(
+        comments_count=Coalesce(models.Subquery(counted), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_user_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_comments_count, migrations.RunPython.noop),
+    ]
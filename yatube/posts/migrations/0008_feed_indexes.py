@@ -0,0 +1,64 @@
+# Generated by Django 2.2.6 on 2026-10-18 02:56
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicates = (Follow.objects.order_by().values('user', 'author')
+                  .annotate(first=models.Min('id'), total=models.Count('id'))
+                  .filter(total__gt=1))
+    users, authors = set(), set()
+    for row in duplicates:
+        Follow.objects.filter(
+            user=row['user'], author=row['author']
+        ).exclude(pk=row['first']).delete()
+        users.add(row['user'])
+        authors.add(row['author'])
+
+    # сигналы счётчиков в миграциях не срабатывают, пересчитываем сами
+    def counted(field):
+        return (Follow.objects.filter(**{field: models.OuterRef('user')})
+                .order_by().values(field).annotate(total=models.Count('id'))
+                .values('total'))
+
+    UserStats.objects.filter(user__in=users).update(
+        following_count=Coalesce(models.Subquery(counted('user')), 0)
+    )
+    UserStats.objects.filter(user__in=authors).update(
+        followers_count=Coalesce(models.Subquery(counted('author')), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', '-id'], name='post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_date_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_follows,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
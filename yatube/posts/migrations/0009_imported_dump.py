@@ -0,0 +1,23 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedDump',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('object_count', models.PositiveIntegerField()),
+                ('imported', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
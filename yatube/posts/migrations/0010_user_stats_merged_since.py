@@ -0,0 +1,33 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    # раньше посты таких авторов не раскладывались вовсе,
+    # поэтому считаем, что подмешиваются они с регистрации
+    UserStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(merged_since=models.Subquery(
+        User.objects.filter(pk=models.OuterRef('user'))
+        .values('date_joined')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_imported_dump'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='merged_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,188 @@
+import base64
+import binascii
+import datetime
+import json
+import math
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+FEED_ORDERING = ('-pub_date', '-pk')
+
+AFTER = 'a'
+BEFORE = 'b'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(values, direction):
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    raw = json.dumps([direction, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def cursor_datetime(value):
+    if not isinstance(value, str):
+        raise ValueError(value)
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def cursor_int(value):
+    # True — тоже int, но сайт таких курсоров не выдаёт
+    if type(value) is not int:
+        raise ValueError(value)
+    return value
+
+
+def cursor_number(value):
+    if type(value) not in (int, float) or not math.isfinite(value):
+        raise ValueError(value)
+    return value
+
+
+# чем проверяется значение каждого поля сортировки в курсоре
+CURSOR_FIELDS = {
+    'pub_date': cursor_datetime,
+    'pk': cursor_int,
+    'rank': cursor_number,
+}
+
+
+def decode_cursor(cursor, ordering=FEED_ORDERING):
+    """Направление и значения курсора, проверенные по полям ordering."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor('Некорректный курсор')
+    if (direction not in (AFTER, BEFORE) or not isinstance(values, list)
+            or len(values) != len(ordering)):
+        raise InvalidCursor('Некорректный курсор')
+    try:
+        return direction, [
+            CURSOR_FIELDS[field.lstrip('-')](value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError):
+        raise InvalidCursor('Некорректный курсор')
+
+
+def cursor_values(obj, ordering):
+    return [getattr(obj, field.lstrip('-')) for field in ordering]
+
+
+def add_cursors(page, ordering=FEED_ORDERING):
+    """Добавляет курсоры соседних страниц к обычной странице Paginator."""
+    objects = page.object_list = list(page.object_list)
+    page.next_cursor = None
+    page.previous_cursor = None
+    if objects and page.has_next():
+        page.next_cursor = encode_cursor(
+            cursor_values(objects[-1], ordering), AFTER
+        )
+    if objects and page.has_previous():
+        page.previous_cursor = encode_cursor(
+            cursor_values(objects[0], ordering), BEFORE
+        )
+    return page
+
+
+def seek(ordering, values, direction):
+    """Условие «строго после/до values» для ключа сортировки ordering."""
+    # (a, b) < (x, y)  ->  a < x OR (a = x AND b < y)
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') == (direction == AFTER)
+        lookup = 'lt' if descending else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values):
+            step &= Q(**{prev_field.lstrip('-'): prev_value})
+        condition |= step
+    return condition
+
+
+def reverse_ordering(ordering):
+    return [
+        field[1:] if field.startswith('-') else '-' + field
+        for field in ordering
+    ]
+
+
+def cursor_page(object_list, paginator, has_next, has_previous):
+    """
+    Обычный Page с курсорами соседних страниц, без COUNT(*).
+
+    Page узнаёт о соседних страницах по своему номеру и num_pages,
+    а общего числа страниц у курсорной ленты нет. Поэтому страница
+    считается второй, если перед ней есть записи, и не последней,
+    если есть записи после; paginator выдаёт одну страницу за запрос.
+    """
+    number = 2 if has_previous else 1
+    paginator.num_pages = number + int(has_next)
+    page = Page(object_list, number, paginator)
+    return add_cursors(page, paginator.ordering)
+
+
+class CursorPaginator(Paginator):
+    """
+    Постраничный вывод по ключу сортировки (по умолчанию pub_date, id).
+
+    Вместо OFFSET и COUNT(*) страница выбирается условием
+    «строго после/до последней показанной записи», поэтому
+    сотая страница стоит столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = ordering
+
+    def sequence(self):
+        """Та же лента для обычного Paginator (ссылки ?page=N)."""
+        return self.object_list
+
+    def fetch(self, limit, values=None, direction=AFTER):
+        """
+        Первые limit записей после курсора (или до него) в порядке
+        обхода: для BEFORE — от курсора к началу ленты.
+        """
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(
+                seek(self.ordering, values, direction)
+            )
+        if direction == BEFORE:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        return list(queryset[:limit])
+
+    def page(self, cursor=None):
+        per_page = self.per_page
+        if cursor is None:
+            objects = self.fetch(per_page + 1)
+            return cursor_page(
+                objects[:per_page], self, len(objects) > per_page, False
+            )
+        direction, values = decode_cursor(cursor, self.ordering)
+        objects = self.fetch(per_page + 1, values, direction)
+        if direction == AFTER:
+            return cursor_page(
+                objects[:per_page], self, len(objects) > per_page, True
+            )
+        has_previous = len(objects) > per_page
+        objects = objects[:per_page][::-1]
+        return cursor_page(objects, self, True, has_previous)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
@@ -0,0 +1,200 @@
+"""
+Полнотекстовый поиск по постам.
+
+Движок выбирается по базе из DATABASES: на SQLite это таблица FTS5
+posts_post_fts, на PostgreSQL — GIN-индекс по to_tsvector(text).
+Оба индекса обновляет сама база при вставке, правке и удалении
+постов: на SQLite триггерами, на PostgreSQL как любой индекс.
+
+Результаты упорядочены по релевантности (rank, меньше — лучше),
+при равной релевантности сначала новые, и листаются курсорами,
+как ленты: страница выбирается условием «после последней показанной».
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .pagination import (
+    AFTER, InvalidCursor, cursor_int, cursor_number, cursor_page,
+    decode_cursor,
+)
+
+SEARCH_ORDERING = ('rank', '-pk')
+# больше слов в запросе не учитываем, чтобы не строить огромный MATCH
+MAX_TERMS = 10
+
+FTS_TABLE = 'posts_post_fts'
+TS_CONFIG = 'russian'
+GIN_INDEX = 'posts_post_text_search_idx'
+
+SQLITE_CREATE = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRES_CREATE = [
+    f"""CREATE INDEX {GIN_INDEX} ON posts_post
+        USING GIN (to_tsvector('{TS_CONFIG}', text))""",
+]
+POSTGRES_DROP = [f'DROP INDEX IF EXISTS {GIN_INDEX}']
+
+SQLITE_MATCHES = f"""
+    SELECT rowid AS id, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+"""
+# ts_rank больше — лучше, поэтому берём с минусом, как bm25 в FTS5
+POSTGRES_MATCHES = f"""
+    SELECT id, -ts_rank(to_tsvector('{TS_CONFIG}', text), query) AS rank
+    FROM posts_post, plainto_tsquery('{TS_CONFIG}', %s) query
+    WHERE to_tsvector('{TS_CONFIG}', text) @@ query
+"""
+
+
+def create_index(schema_editor):
+    statements = {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_index(schema_editor):
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query)[:MAX_TERMS]
+
+
+def matches_sql(terms):
+    """SQL всех совпадений с колонками id и rank и его параметры."""
+    if connection.vendor == 'sqlite':
+        # каждое слово в кавычках: синтаксис FTS5 из запроса не действует
+        return SQLITE_MATCHES, [' '.join(f'"{term}"' for term in terms)]
+    if connection.vendor == 'postgresql':
+        return POSTGRES_MATCHES, [' '.join(terms)]
+    raise ImproperlyConfigured(
+        f'Поиск не поддерживает базу {connection.vendor}'
+    )
+
+
+class RawSubquery(RawSQL):
+    """
+    Подзапрос для lookup __in. RawSQL сам берёт себя в скобки, __in
+    добавляет ещё одни, и IN ((SELECT ...)) база читает как скалярный
+    подзапрос: SQLite берёт из него одну строку, PostgreSQL падает.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def filter_matching(queryset, query):
+    """Оставляет в queryset посты, найденные по запросу, без ранжирования."""
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    sql, params = matches_sql(terms)
+    return queryset.filter(
+        pk__in=RawSubquery(f'SELECT id FROM ({sql}) matches', params)
+    )
+
+
+def find_ids(terms, limit, cursor_values=None, direction=AFTER):
+    """
+    Пары (id, rank) одной страницы результатов.
+
+    Страница после курсора (rank, id) — это записи с большим rank
+    или с тем же rank и меньшим id; до курсора — наоборот.
+    """
+    sql, params = matches_sql(terms)
+    order = 'rank, id DESC' if direction == AFTER else 'rank DESC, id'
+    seek = ''
+    if cursor_values is not None:
+        try:
+            rank, pk = cursor_values
+            rank, pk = cursor_number(rank), cursor_int(pk)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Некорректный курсор')
+        more, less = ('>', '<') if direction == AFTER else ('<', '>')
+        seek = f'WHERE rank {more} %s OR (rank = %s AND id {less} %s)'
+        params += [rank, rank, pk]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id, rank FROM ({sql}) matches {seek} '
+            f'ORDER BY {order} LIMIT %s',
+            params + [limit],
+        )
+        return cursor.fetchall()
+
+
+class SearchPaginator(Paginator):
+    """
+    Курсорный постраничный вывод результатов поиска.
+
+    Позиции берутся из полнотекстового индекса, а сами посты —
+    из post_list одним запросом по id.
+    """
+
+    def __init__(self, query, post_list, per_page):
+        super().__init__(post_list, per_page)
+        self.terms = search_terms(query)
+        self.ordering = SEARCH_ORDERING
+
+    def _posts(self, rows):
+        posts = self.object_list.filter(
+            pk__in=[pk for pk, rank in rows]
+        ).order_by()
+        posts = {post.pk: post for post in posts}
+        found = []
+        for pk, rank in rows:
+            if pk in posts:
+                posts[pk].rank = rank
+                found.append(posts[pk])
+        return found
+
+    def page(self, cursor=None):
+        per_page = self.per_page
+        if not self.terms:
+            return cursor_page([], self, False, False)
+        if cursor is None:
+            rows = find_ids(self.terms, per_page + 1)
+            return cursor_page(self._posts(rows[:per_page]), self,
+                               len(rows) > per_page, False)
+        direction, values = decode_cursor(cursor, self.ordering)
+        rows = find_ids(self.terms, per_page + 1, values, direction)
+        if direction == AFTER:
+            return cursor_page(self._posts(rows[:per_page]), self,
+                               len(rows) > per_page, True)
+        has_previous = len(rows) > per_page
+        return cursor_page(self._posts(rows[:per_page][::-1]), self,
+                           True, has_previous)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
@@ -0,0 +1,47 @@
+"""
+Хранилище картинок постов, адресуемое по содержимому.
+
+Файл называется по SHA-256 своего содержимого, поэтому одинаковые
+загрузки хранятся один раз, а sorl-thumbnail, который строит ключи
+миниатюр по имени исходного файла, режет их тоже один раз. Файлы,
+на которые больше не ссылается ни один пост, удаляет команда
+collect_media_garbage.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = content_hash(content)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        # первые два символа хеша — подкаталог, чтобы не держать
+        # все картинки в одном каталоге
+        name = os.path.join(directory, digest[:2], digest + extension)
+        try:
+            # файл уже есть: обновляем время правки, чтобы
+            # collect_media_garbage не удалил его, пока сохраняется
+            # пост, который на него сошлётся
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            # если тот же файл одновременно сохраняет другой запрос,
+            # _save выберет имя с суффиксом: это лишняя копия, а не ошибка
+            return self._save(name, content)
+        return name
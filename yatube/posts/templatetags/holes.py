@@ -0,0 +1,18 @@
+from django import template
+
+from posts.holes import is_skeleton, make_marker, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """
+    Блок, который зависит от читателя.
+
+    Обычно рендерится на месте, а в общей закешированной странице
+    оставляет метку, которую заполняет posts.holes.fill_holes.
+    """
+    if is_skeleton(context.get('request')):
+        return make_marker(name, params)
+    return render_hole(name, context, params)
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import feed_version, group_scope, index_scope, profile_scope
+from posts.cards import card_key
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='title', slug='first',
+                                         description='description')
+        cls.other_group = Group.objects.create(title='title', slug='second',
+                                               description='description')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedCacheTests.user)
+
+    def test_new_post_keeps_unrelated_cache(self):
+        """Новый пост обновляет главную, но не чистит весь кеш"""
+        cache.set('unrelated', 'value')
+        self.authorized_client.get(reverse('index'))
+        self.authorized_client.post(reverse('new_post'), {'text': 'fresh'})
+        self.assertEqual(cache.get('unrelated'), 'value')
+        response = self.authorized_client.get(reverse('index'))
+        self.assertContains(response, 'fresh')
+
+    def test_edit_bumps_only_affected_feeds(self):
+        """Правка поста меняет версии только его лент"""
+        post = Post.objects.create(text='text', author=FeedCacheTests.user,
+                                   group=FeedCacheTests.group)
+        scopes = [
+            index_scope(),
+            profile_scope(FeedCacheTests.user.username),
+            group_scope(FeedCacheTests.group.slug),
+            group_scope(FeedCacheTests.other_group.slug),
+            profile_scope('someone-else'),
+        ]
+        before = [feed_version(scope) for scope in scopes]
+        self.authorized_client.post(
+            reverse('post_edit', args=[FeedCacheTests.user.username, post.pk]),
+            {'text': 'edited', 'group': FeedCacheTests.other_group.pk}
+        )
+        after = [feed_version(scope) for scope in scopes]
+        changed = [b != a for b, a in zip(before, after)]
+        self.assertEqual(changed, [True, True, True, True, False])
+
+    def test_post_cards_are_cached_per_post_version(self):
+        """Карточка берётся из кеша и пересобирается после правки поста"""
+        post = Post.objects.create(text='original',
+                                   author=FeedCacheTests.user)
+        url = reverse('profile', args=[FeedCacheTests.user.username])
+        self.authorized_client.get(url)
+        self.assertEqual(len(cache.get_many([card_key(post)])), 1)
+        self.authorized_client.post(
+            reverse('post_edit', args=[FeedCacheTests.user.username, post.pk]),
+            {'text': 'edited'}
+        )
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'edited')
+        self.assertNotContains(response, 'original')
+
+    def test_cached_cards_keep_viewer_buttons(self):
+        """Кнопки в карточке зависят от читателя, а не от кеша"""
+        Post.objects.create(text='text', author=FeedCacheTests.user)
+        url = reverse('profile', args=[FeedCacheTests.user.username])
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Редактировать')
+        reader = Client()
+        reader.force_login(User.objects.create_user(username='reader'))
+        response = reader.get(url)
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertNotContains(response, 'Редактировать')
+        response = Client().get(url)
+        self.assertNotContains(response, 'Добавить комментарий')
+
+    def test_index_is_shared_between_readers(self):
+        """Главная кешируется одна на всех, персональные блоки свои"""
+        Post.objects.create(text='text', author=FeedCacheTests.user)
+        Client().get(reverse('index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('index'))
+        self.assertFalse(any(
+            'posts_post' in query['sql'] for query in queries
+        ))
+        self.assertContains(response, 'Пользователь: author')
+        self.assertContains(response, 'Редактировать')
+        self.assertContains(response, 'Избранные авторы')
+        self.assertNotContains(response, '<!--hole')
+        response = Client().get(reverse('index'))
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'Пользователь: author')
+        self.assertNotContains(response, 'Добавить комментарий')
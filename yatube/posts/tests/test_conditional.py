@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='title', slug='slug',
+                                         description='description')
+        cls.post = Post.objects.create(text='text', author=cls.user,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.reader)
+
+    def revalidate(self, url):
+        """Повторяет запрос с ETag первого ответа"""
+        etag = self.authorized_client.get(url)['ETag']
+        return self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_rendered(self):
+        """Неизменившиеся страницы отдаются как 304 без рендеринга"""
+        post = ConditionalGetTests.post
+        urls = [
+            reverse('index'),
+            reverse('group_posts', args=[post.group.slug]),
+            reverse('profile', args=[post.author.username]),
+            reverse('post', args=[post.author.username, post.pk]),
+            reverse('follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_feed_etags_do_not_read_posts(self):
+        """ETag лент строится из версий, а не из постов ленты"""
+        post = ConditionalGetTests.post
+        urls = [
+            reverse('group_posts', args=[post.group.slug]),
+            reverse('profile', args=[post.author.username]),
+            reverse('follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse([
+                    query['sql'] for query in queries.captured_queries
+                    if Post._meta.db_table in query['sql']
+                ])
+
+    def test_changes_invalidate_etag(self):
+        """Правка, комментарий, удаление и подписка меняют ETag"""
+        post = ConditionalGetTests.post
+        reader = ConditionalGetTests.reader
+
+        def edit_post():
+            author_client = Client()
+            author_client.force_login(post.author)
+            author_client.post(
+                reverse('post_edit', args=[post.author.username, post.pk]),
+                {'text': 'edited', 'group': post.group.pk},
+            )
+
+        def delete_post():
+            Post.objects.create(text='old', author=post.author,
+                                group=post.group).delete()
+
+        changes = [
+            (reverse('profile', args=[post.author.username]), edit_post),
+            (reverse('post', args=[post.author.username, post.pk]),
+             lambda: Comment.objects.create(post=post, author=reader,
+                                            text='text')),
+            (reverse('group_posts', args=[post.group.slug]), delete_post),
+            (reverse('follow_index'),
+             lambda: Follow.objects.create(user=reader, author=post.author)),
+        ]
+        # число комментариев видно и в карточках лент
+        changes += [
+            (url, lambda: Comment.objects.create(post=post, author=reader,
+                                                 text='text'))
+            for url in (reverse('group_posts', args=[post.group.slug]),
+                        reverse('profile', args=[post.author.username]),
+                        reverse('follow_index'))
+        ]
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_reader(self):
+        """Другой читатель не получает 304 по чужому ETag"""
+        url = reverse('index')
+        etag = self.authorized_client.get(url)['ETag']
+        response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return UserStats.objects.values_list(
+            'followers_count', 'following_count', 'posts_count'
+        ).get(user=user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении постов и подписок"""
+        post = Post.objects.create(text='text', author=UserStatsTests.author)
+        follow = Follow.objects.create(user=UserStatsTests.reader,
+                                       author=UserStatsTests.author)
+        self.assertEqual(self.stats(UserStatsTests.author), (1, 0, 1))
+        self.assertEqual(self.stats(UserStatsTests.reader), (0, 1, 0))
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.stats(UserStatsTests.author), (0, 0, 0))
+        self.assertEqual(self.stats(UserStatsTests.reader), (0, 0, 0))
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда сверки исправляет разошедшиеся счётчики"""
+        Post.objects.create(text='text', author=UserStatsTests.author)
+        UserStats.objects.filter(user=UserStatsTests.author).update(
+            posts_count=42, followers_count=7
+        )
+        UserStats.objects.filter(user=UserStatsTests.reader).delete()
+        call_command('reconcile_user_stats', stdout=StringIO())
+        self.assertEqual(self.stats(UserStatsTests.author), (0, 0, 1))
+        self.assertEqual(self.stats(UserStatsTests.reader), (0, 0, 0))
+
+    def test_author_card_reads_counters(self):
+        """Карточка автора не считает строки подписок и постов"""
+        Follow.objects.create(user=UserStatsTests.reader,
+                              author=UserStatsTests.author)
+        post = Post.objects.create(text='text', author=UserStatsTests.author)
+        urls = [
+            reverse('profile', args=[UserStatsTests.author.username]),
+            reverse('post', args=[UserStatsTests.author.username, post.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = Client().get(url)
+                self.assertContains(response, 'Подписчиков: 1')
+                self.assertContains(response, 'Публикаций: 1')
+                self.assertFalse(any(
+                    'COUNT(*)' in query['sql'] for query in queries
+                    if 'posts_follow' in query['sql']
+                ))
+
+
+class CommentsCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='text', author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CommentsCountTests.user)
+
+    def comments_count(self):
+        return Post.objects.get(pk=CommentsCountTests.post.pk).comments_count
+
+    def test_comments_count_follows_comments(self):
+        """Число комментариев меняется при добавлении и удалении"""
+        url = reverse('add_comment', args=[
+            CommentsCountTests.user.username, CommentsCountTests.post.pk
+        ])
+        self.authorized_client.post(url, {'text': 'first'})
+        self.authorized_client.post(url, {'text': 'second'})
+        self.assertEqual(self.comments_count(), 2)
+        Comment.objects.filter(text='first').delete()
+        self.assertEqual(self.comments_count(), 1)
+
+    def test_repair_command(self):
+        """Команда восстанавливает число комментариев"""
+        Comment.objects.create(post=CommentsCountTests.post,
+                               author=CommentsCountTests.user, text='text')
+        Post.objects.update(comments_count=10)
+        call_command('repair_comment_counts', stdout=StringIO())
+        self.assertEqual(self.comments_count(), 1)
+
+    def test_feed_does_not_touch_comments(self):
+        """Лента не обращается к таблице комментариев"""
+        Comment.objects.create(post=CommentsCountTests.post,
+                               author=CommentsCountTests.user, text='text')
+        url = reverse('profile', args=[CommentsCountTests.user.username])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertContains(response, 'Комментариев: 1')
+        self.assertFalse(any(
+            'posts_comment' in query['sql'] for query in queries
+        ))
@@ -0,0 +1,100 @@
+import csv
+import json
+import tracemalloc
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.export import export_lines
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.first = Post.objects.create(text='first', author=cls.author,
+                                        image='posts/ab/picture.jpg')
+        cls.second = Post.objects.create(text='second', author=cls.author)
+        Post.objects.create(text='foreign', author=cls.reader)
+        Comment.objects.create(post=cls.first, author=cls.reader,
+                               text='comment one')
+        Comment.objects.create(post=cls.first, author=cls.author,
+                               text='comment two')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ExportTests.author)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        """Посты идут от новых к старым, за каждым — его комментарии"""
+        response = self.client.get(
+            reverse('export_posts', args=['author']), {'format': 'ndjson'}
+        )
+        self.assertTrue(response.streaming)
+        records = [json.loads(line)
+                   for line in self.read(response).splitlines()]
+        self.assertEqual(
+            [(record['type'], record['text']) for record in records],
+            [('post', 'second'), ('post', 'first'),
+             ('comment', 'comment one'), ('comment', 'comment two')],
+        )
+        self.assertEqual(records[1]['image_url'],
+                         'http://testserver/media/posts/ab/picture.jpg')
+        self.assertEqual(records[2]['post_id'], ExportTests.first.pk)
+        self.assertEqual(records[2]['author'], 'reader')
+
+    def test_csv_export(self):
+        response = self.client.get(
+            reverse('export_posts', args=['author']), {'format': 'csv'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(self.read(response))))
+        self.assertEqual([row['text'] for row in rows],
+                         ['second', 'first', 'comment one', 'comment two'])
+        self.assertEqual(rows[0]['comments_count'], '0')
+
+    def test_only_author_can_export(self):
+        client = Client()
+        client.force_login(ExportTests.reader)
+        response = client.get(reverse('export_posts', args=['author']))
+        self.assertRedirects(response, reverse('profile', args=['author']))
+
+    def test_command_writes_file(self):
+        output = StringIO()
+        call_command('export_posts', 'author', '--base-url',
+                     'https://yatube.example/', stdout=output)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[1]['image_url'],
+                         'https://yatube.example/media/posts/ab/picture.jpg')
+
+    @mock.patch('posts.export.CHUNK_SIZE', 100)
+    def test_memory_does_not_grow_with_profile(self):
+        """Пиковая память выгрузки не зависит от числа постов"""
+        def peak(author):
+            tracemalloc.start()
+            for _ in export_lines(author, 'ndjson'):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        small = User.objects.create_user(username='small')
+        large = User.objects.create_user(username='large')
+        for user, count in ((small, 1000), (large, 5000)):
+            Post.objects.bulk_create(
+                Post(text='x' * 200, author=user) for _ in range(count)
+            )
+        self.assertLess(peak(large), peak(small) * 1.5)
@@ -86,11 +86,12 @@ class PostFormTests(TestCase):
         # Проверяем, увеличилось ли число постов
         self.assertEqual(Post.objects.count(), posts_count + 1)
         # Проверяем, что создалась запись с нашим слагом
+        # картинка пережата в JPEG и названа по хешу содержимого
         self.assertTrue(
             Post.objects.filter(
                 text='Тестовый текст',
                 author=PostFormTests.user,
-                image='posts/small.gif'
+                image__regex=r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$'
             ).exists()
         )
 
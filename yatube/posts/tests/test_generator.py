@@ -0,0 +1,102 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from posts import timeline
+from posts.counters import reconcile_user_stats, repair_comment_counts
+from posts.generator import Generator
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.search import SearchPaginator
+
+User = get_user_model()
+
+SIZES = {'users': 50, 'groups': 5, 'posts': 400, 'comments': 600,
+         'follows': 300}
+
+
+class GenerateDataTests(TransactionTestCase):
+    # поисковый индекс пересоздаётся, а на SQLite схему нельзя
+    # менять внутри транзакции TestCase
+
+    def generate(self, seed, **options):
+        call_command('generate_data', seed=seed, stdout=StringIO(),
+                     **SIZES, **options)
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('pk').values_list(
+                'username', 'password', 'date_joined'
+            )),
+            list(Post.objects.order_by('pk').values_list(
+                'text', 'author__username', 'group__slug', 'pub_date'
+            )),
+            list(Follow.objects.order_by('user', 'author').values_list(
+                'user__username', 'author__username'
+            )),
+            list(Comment.objects.order_by('pk').values_list('post', 'text')),
+        )
+
+    def test_creates_consistent_data(self):
+        """Счётчики, ленты и поиск сходятся с созданными строками"""
+        self.generate(1)
+        self.assertEqual(User.objects.count(), SIZES['users'])
+        self.assertEqual(Group.objects.count(), SIZES['groups'])
+        self.assertEqual(Post.objects.count(), SIZES['posts'])
+        self.assertEqual(Comment.objects.count(), SIZES['comments'])
+        self.assertGreater(Follow.objects.count(), 0)
+        self.assertEqual(reconcile_user_stats(), 0)
+        counts = list(Post.objects.order_by('pk')
+                      .values_list('comments_count', flat=True))
+        repair_comment_counts()
+        self.assertEqual(counts, list(Post.objects.order_by('pk')
+                                      .values_list('comments_count',
+                                                   flat=True)))
+        entries = TimelineEntry.objects.count()
+        timeline.rebuild()
+        self.assertEqual(TimelineEntry.objects.count(), entries)
+        word = Post.objects.first().text.split()[0]
+        page = SearchPaginator(word, Post.objects.all(), 10).page()
+        self.assertTrue(len(page))
+
+    def test_same_seed_gives_same_data(self):
+        """Один и тот же seed даёт одни и те же данные"""
+        self.generate(7, password='secret')
+        first = self.snapshot()
+        call_command('flush', interactive=False, verbosity=0)
+        self.generate(7, password='secret')
+        self.assertEqual(self.snapshot(), first)
+        self.assertTrue(User.objects.first().check_password('secret'))
+
+    def test_posts_are_skewed(self):
+        """У популярных авторов постов намного больше, чем у обычных"""
+        self.generate(1)
+        counts = sorted(
+            (author.posts.count() for author in User.objects.all()),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2])
+
+    def test_refuses_taken_names(self):
+        """На базе, где имя нового пользователя занято, ничего не пишется"""
+        first = User.objects.create_user(username='first')
+        # следующий id достанется этому пользователю, а его имя —
+        # первому пользователю генератора
+        taken = f'user{first.pk + 2}'
+        User.objects.create_user(username=taken)
+        with self.assertRaisesMessage(CommandError, taken):
+            self.generate(1)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_search_index_is_restored_after_failure(self):
+        """Поисковый индекс возвращается, даже если запись оборвалась"""
+        with mock.patch.object(Generator, 'write_comments',
+                               side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.generate(1)
+        word = Post.objects.first().text.split()[0]
+        page = SearchPaginator(word, Post.objects.all(), 10).page()
+        self.assertTrue(len(page))
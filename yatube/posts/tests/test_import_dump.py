@@ -0,0 +1,99 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from posts.importer import iter_objects
+from posts.models import (Comment, Follow, Group, ImportedDump, Post,
+                          TimelineEntry, UserStats)
+from posts.search import filter_matching
+
+User = get_user_model()
+
+DUMP = os.path.join(settings.BASE_DIR, 'dump.json')
+
+
+class IterObjectsTests(SimpleTestCase):
+    def test_small_reads_match_json_load(self):
+        """Объекты, разрезанные границами чтения, собираются целиком"""
+        with open(DUMP, encoding='utf-8') as file:
+            text = file.read()
+        for read_size in (1, 7, 1000):
+            with self.subTest(read_size=read_size):
+                objects = list(iter_objects(io.StringIO(text), read_size))
+                self.assertEqual(objects, json.loads(text))
+
+    def test_broken_dump_raises(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_objects(io.StringIO('[{"model": "posts.group"'), 4))
+
+
+class ImportDumpTests(TransactionTestCase):
+    # индексы снимаются и строятся заново, а на SQLite схему нельзя
+    # менять внутри транзакции TestCase
+
+    def import_dump(self, path=DUMP, **options):
+        output = StringIO()
+        call_command('import_dump', path, stdout=output, **options)
+        return output.getvalue()
+
+    def test_loads_dump(self):
+        """Загружает все объекты дампа и пересчитывает производные данные"""
+        self.import_dump(batch_size=10)
+        with open(DUMP, encoding='utf-8') as file:
+            expected = {}
+            for item in json.load(file):
+                expected[item['model']] = expected.get(item['model'], 0) + 1
+        self.assertEqual(Post.objects.count(), expected['posts.post'])
+        self.assertEqual(Comment.objects.count(), expected['posts.comment'])
+        self.assertEqual(Follow.objects.count(), expected['posts.follow'])
+        self.assertEqual(Group.objects.count(), expected['posts.group'])
+        self.assertEqual(User.objects.count(), expected['auth.user'])
+        self.assertEqual(UserStats.objects.count(), User.objects.count())
+        commented = Post.objects.get(pk=Comment.objects.first().post_id)
+        self.assertEqual(commented.comments_count,
+                         commented.comments.count())
+        self.assertTrue(TimelineEntry.objects.exists())
+        post = Post.objects.first()
+        word = post.text.split()[0]
+        self.assertIn(post, filter_matching(Post.objects.all(), word))
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, constraints)
+
+    def test_second_run_is_skipped(self):
+        self.import_dump()
+        Post.objects.all().delete()
+        output = self.import_dump()
+        self.assertIn('уже загружен', output)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(ImportedDump.objects.count(), 1)
+        self.import_dump(force=True)
+        self.assertTrue(Post.objects.exists())
+
+    def test_keeps_existing_rows(self):
+        Group.objects.create(pk=1, title='Своя группа', slug='own')
+        self.import_dump()
+        self.assertEqual(Group.objects.get(pk=1).title, 'Своя группа')
+        self.assertTrue(Post.objects.exists())
+
+    def test_gzip(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'dump.json.gz')
+        with open(DUMP, 'rb') as source, gzip.open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        self.import_dump(path)
+        self.assertTrue(Post.objects.exists())
@@ -0,0 +1,176 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.counters import reconcile_user_stats
+from posts.models import Comment, Follow, Group, Post
+from posts.search import FTS_TABLE
+
+User = get_user_model()
+
+USERS = 50
+GROUPS = 20
+POSTS = 1000
+
+# COUNT, SUM, MAX и прочие по постам или записям лент читают все строки
+# ленты, сколько бы их ни было
+AGGREGATE = re.compile(r'\b(COUNT|SUM|MAX|MIN|AVG)\(')
+FEED_TABLES = ('posts_post', 'posts_timelineentry')
+
+
+def query_plan(sql):
+    """Строки плана запроса в том виде, как их печатает база."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # на маленькой базе Postgres честно предпочтёт перебор,
+            # поэтому спрашиваем, найдётся ли план без него
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, plan):
+    """
+    Полные переборы таблиц, сортировки во временных таблицах и агрегаты
+    по лентам.
+    """
+    problems = []
+    if AGGREGATE.search(sql) and any(f'FROM "{table}"' in sql
+                                     for table in FEED_TABLES):
+        # по индексу такой запрос всё равно читает всю ленту, и план
+        # это не выдаст: SEARCH по индексу без LIMIT
+        problems.append('aggregate over a feed')
+    for line in plan:
+        if FTS_TABLE in sql and 'TEMP B-TREE FOR ORDER BY' in line:
+            # релевантность считается для каждого совпадения заново,
+            # индекса по ней нет и быть не может
+            continue
+        words = line.replace('SCAN TABLE', 'SCAN').split()
+        if connection.vendor == 'postgresql':
+            bad = 'Seq Scan' in line or line.lstrip(' ->').startswith('Sort')
+        else:
+            # SCAN t USING INDEX — обход индекса по порядку: годится,
+            # только если его останавливает LIMIT, иначе это тот же
+            # полный перебор, просто в порядке индекса
+            bad = ('USE TEMP B-TREE' in line
+                   or (words[:1] == ['SCAN'] and 'VIRTUAL' not in words
+                       and not ('USING' in words and 'LIMIT' in sql)))
+        if bad:
+            problems.append(line)
+    return problems
+
+
+class QueryPlanTests(TestCase):
+    """
+    Запросы страниц с лентами и постами идут по индексам.
+
+    Для каждой страницы собираем все её запросы к постам, подпискам
+    и комментариям и проверяем их планы. Агрегаты по постам и лентам
+    не допускаются вовсе, в том числе в ETag (см. posts.conditional).
+    """
+    TABLES = ('posts_post', 'posts_follow', 'posts_comment',
+              'posts_timelineentry')
+
+    @classmethod
+    def setUpTestData(cls):
+        # данных столько, чтобы статистика ANALYZE была похожа на живую:
+        # много авторов, групп и подписок, у каждого понемногу постов
+        users = [User(username=f'user{i}', password='!') for i in range(USERS)]
+        User.objects.bulk_create(users)
+        users = list(User.objects.order_by('pk'))
+        cls.author, cls.reader = users[0], users[1]
+        groups = [Group(title=f'group {i}', slug=f'group{i}',
+                        description='description') for i in range(GROUPS)]
+        Group.objects.bulk_create(groups)
+        groups = list(Group.objects.order_by('pk'))
+        cls.group = groups[0]
+        Post.objects.bulk_create(
+            Post(text=f'post {i}', author=users[i % USERS],
+                 group=groups[i % GROUPS] if i % 3 else None)
+            for i in range(POSTS)
+        )
+        cls.post = Post.objects.filter(author=cls.author).first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.reader, text='comment')
+            for post in Post.objects.all()[:POSTS // 2]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=users[(i + step) % USERS])
+            for i, user in enumerate(users) for step in range(1, 6)
+        )
+        # bulk_create не шлёт сигналов, счётчики и ленты считаем сами
+        reconcile_user_stats()
+        timeline.rebuild()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryPlanTests.reader)
+
+    def assertIndexed(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if not any(table in sql for table in self.TABLES):
+                continue
+            checked += 1
+            problems = plan_problems(sql, query_plan(sql))
+            self.assertEqual(problems, [], sql)
+        self.assertGreater(checked, 0)
+
+    def test_index(self):
+        self.assertIndexed(reverse('index'))
+
+    def test_index_next_page(self):
+        page = self.client.get(reverse('index')).context['page']
+        cache.clear()
+        self.assertIndexed(reverse('index'), cursor=page.next_cursor)
+
+    def test_group_posts(self):
+        url = reverse('group_posts', args=[QueryPlanTests.group.slug])
+        self.assertIndexed(url)
+        page = self.client.get(url).context['page']
+        self.assertIndexed(url, cursor=page.next_cursor)
+
+    def test_profile(self):
+        url = reverse('profile', args=[QueryPlanTests.author.username])
+        self.assertIndexed(url)
+        page = self.client.get(url).context['page']
+        self.assertIndexed(url, cursor=page.next_cursor)
+
+    def test_post(self):
+        self.assertIndexed(reverse('post', args=[
+            QueryPlanTests.author.username, QueryPlanTests.post.pk
+        ]))
+
+    def test_follow_index(self):
+        url = reverse('follow_index')
+        self.assertIndexed(url)
+        page = self.client.get(url).context['page']
+        self.assertEqual(len(page), 10)
+        self.assertIndexed(url, cursor=page.next_cursor)
+
+    def test_search(self):
+        self.assertIndexed(reverse('search'), q='post')
+
+    def test_unique_follow(self):
+        """Повторная подписка не создаёт вторую запись"""
+        self.client.get(reverse('profile_follow',
+                                args=[QueryPlanTests.author.username]))
+        self.assertEqual(Follow.objects.filter(
+            user=QueryPlanTests.reader, author=QueryPlanTests.author
+        ).count(), 1)
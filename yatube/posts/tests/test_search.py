@@ -0,0 +1,129 @@
+import base64
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import SearchPaginator, filter_matching
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, query):
+        page = SearchPaginator(query, Post.objects.all(), 10).get_page()
+        return [post.text for post in page]
+
+    def test_results_are_ranked(self):
+        """Пост, где слово встречается чаще, выше в выдаче"""
+        Post.objects.create(text='кот и собака', author=SearchTests.user)
+        Post.objects.create(text='кот кот кот', author=SearchTests.user)
+        Post.objects.create(text='только собака', author=SearchTests.user)
+        self.assertEqual(self.found('кот'), ['кот кот кот', 'кот и собака'])
+        self.assertEqual(self.found('кот собака'), ['кот и собака'])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при создании, правке и удалении поста"""
+        post = Post.objects.create(text='старый текст',
+                                   author=SearchTests.user)
+        self.assertEqual(self.found('старый'), ['старый текст'])
+        post.text = 'новый текст'
+        post.save()
+        self.assertEqual(self.found('старый'), [])
+        self.assertEqual(self.found('новый'), ['новый текст'])
+        post.delete()
+        self.assertEqual(self.found('новый'), [])
+
+    def test_query_syntax_is_ignored(self):
+        """Операторы FTS в запросе считаются обычными словами"""
+        Post.objects.create(text='NOT AND OR', author=SearchTests.user)
+        self.assertEqual(self.found('"NOT* (AND'), ['NOT AND OR'])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_search_pages_by_cursor(self):
+        """Все результаты проходятся курсорами без повторов"""
+        Post.objects.bulk_create(
+            Post(text=f'слово {i}', author=SearchTests.user)
+            for i in range(25)
+        )
+        url = reverse('search')
+        response = self.client.get(url, {'q': 'слово'})
+        seen = [post.pk for post in response.context['page']]
+        while response.context['page'].has_next():
+            response = self.client.get(url, {
+                'q': 'слово',
+                'cursor': response.context['page'].next_cursor,
+            })
+            seen += [post.pk for post in response.context['page']]
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        back = self.client.get(url, {
+            'q': 'слово',
+            'cursor': response.context['page'].previous_cursor,
+        })
+        self.assertEqual([post.pk for post in back.context['page']],
+                         seen[10:20])
+
+    def test_tampered_cursor_shows_first_page(self):
+        """Курсор с чужими значениями показывает первую страницу"""
+        Post.objects.create(text='слово', author=SearchTests.user)
+        for values in (['x', 1], [1.5, 'x'], [1.5, None], [1.5]):
+            with self.subTest(values=values):
+                cursor = base64.urlsafe_b64encode(
+                    json.dumps(['a', values]).encode()
+                ).decode()
+                response = self.client.get(
+                    reverse('search'), {'q': 'слово', 'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page']), 1)
+
+    def test_search_page_renders_cards(self):
+        """Страница поиска показывает найденные посты и сохраняет запрос"""
+        Post.objects.create(text='искомый пост', author=SearchTests.user)
+        Post.objects.create(text='другой', author=SearchTests.user)
+        response = self.client.get(reverse('search'), {'q': 'искомый'})
+        self.assertContains(response, 'искомый пост')
+        self.assertNotContains(response, 'другой')
+        self.assertContains(response, 'value="искомый"')
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по индексу"""
+        post = Post.objects.create(text='админ', author=SearchTests.user)
+        Post.objects.create(text='другой', author=SearchTests.user)
+        self.assertEqual(
+            list(filter_matching(Post.objects.all(), 'админ')), [post]
+        )
+
+    def test_filter_matching_returns_every_match(self):
+        for number in range(3):
+            Post.objects.create(text=f'совпадение {number}',
+                                author=SearchTests.user)
+        self.assertEqual(
+            filter_matching(Post.objects.all(), 'совпадение').count(), 3
+        )
+
+
+class RebuildSearchIndexTests(TransactionTestCase):
+    # схему нельзя менять внутри транзакции TestCase на SQLite
+    def test_rebuild_restores_index(self):
+        """Команда пересоздаёт индекс по текущим постам"""
+        user = User.objects.create_user(username='author')
+        Post.objects.create(text='до пересборки', author=user)
+        call_command('rebuild_search_index', stdout=StringIO())
+        page = SearchPaginator('пересборки', Post.objects.all(), 10).page()
+        self.assertEqual([post.text for post in page], ['до пересборки'])
@@ -0,0 +1,100 @@
+import os
+import shutil
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Post
+from posts.thumbnails import cached_thumbnails, generate_thumbnails
+
+from .test_thumbnails import image_file
+
+User = get_user_model()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+TESTMEDIA = os.path.join(BASE_DIR, "testmedia")
+
+
+@override_settings(MEDIA_ROOT=TESTMEDIA)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(TESTMEDIA, ignore_errors=True)
+
+    def create_post(self, name='image.png'):
+        return Post.objects.create(text='text', author=self.user,
+                                   image=image_file(name))
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые загрузки хранятся одним файлом с общими миниатюрами"""
+        first = self.create_post('first.png')
+        second = self.create_post('second.png')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1
+        )
+        generate_thumbnails(first.image)
+        self.assertEqual(cached_thumbnails(second.image)['card'].name,
+                         cached_thumbnails(first.image)['card'].name)
+
+    def test_different_content_gets_different_names(self):
+        """Разное содержимое — разные имена"""
+        post = self.create_post()
+        other = Post.objects.create(text='text', author=self.user,
+                                    image=ContentFile(b'other', 'image.png'))
+        self.assertNotEqual(post.image.name, other.image.name)
+
+    def test_garbage_collection(self):
+        """Удаляются только картинки без постов вместе с миниатюрами"""
+        kept = self.create_post('kept.png')
+        orphan = Post.objects.create(
+            text='text', author=self.user,
+            image=ContentFile(b'orphan', 'orphan.png'),
+        )
+        path = orphan.image.path
+        orphan.delete()
+        call_command('collect_media_garbage', grace=0, stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(kept.image.path))
+
+    def test_duplicate_upload_refreshes_mtime(self):
+        """Повторная загрузка освежает время файла для сборщика мусора"""
+        first = self.create_post()
+        os.utime(first.image.path, (0, 0))
+        self.create_post()
+        self.assertGreater(os.path.getmtime(first.image.path), 0)
+
+    def test_garbage_collection_rechecks_references(self):
+        """Файл, на который сослались во время сборки, не удаляется"""
+        orphan = Post.objects.create(
+            text='text', author=self.user,
+            image=ContentFile(b'orphan', 'orphan.png'),
+        )
+        name, path = orphan.image.name, orphan.image.path
+        orphan.delete()
+
+        def walk(storage, directory):
+            # пост с тем же файлом сохраняется, пока идёт обход
+            Post.objects.create(text='text', author=self.user, image=name)
+            yield name
+
+        with mock.patch(
+            'posts.management.commands.collect_media_garbage.walk', walk
+        ):
+            call_command('collect_media_garbage', grace=0,
+                         stdout=StringIO())
+        self.assertTrue(os.path.exists(path))
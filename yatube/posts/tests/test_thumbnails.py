@@ -0,0 +1,121 @@
+import os
+import shutil
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+
+from posts.models import Post
+from posts.thumbnails import (MISS_TIMEOUT, cached_thumbnails,
+                              generate_thumbnails)
+
+User = get_user_model()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+TESTMEDIA = os.path.join(BASE_DIR, "testmedia")
+
+
+def image_file(name='image.png', color=(255, 0, 0)):
+    content = BytesIO()
+    Image.new('RGB', (100, 50), color=color).save(content, 'png')
+    return SimpleUploadedFile(name, content.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TESTMEDIA, POST_THUMBNAIL_WORKERS=0)
+class ThumbnailPipelineTests(TransactionTestCase):
+    def tearDown(self):
+        shutil.rmtree(TESTMEDIA, ignore_errors=True)
+
+    def test_new_post_generates_thumbnails(self):
+        """После публикации миниатюры создаются без участия ленты"""
+        user = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(user)
+        client.post(reverse('new_post'),
+                    {'text': 'text', 'image': image_file()})
+        post = Post.objects.get()
+        self.assertNotIn(None, cached_thumbnails(post.image).values())
+
+    def test_feed_does_not_resize_without_workers(self):
+        """Без фоновых потоков лента не создаёт миниатюры в ответе"""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(text='text', author=user,
+                                   image=image_file())
+        cache.clear()
+        with mock.patch('posts.thumbnails.generate_thumbnails') as generate:
+            response = Client().get(reverse('profile', args=[user.username]))
+        generate.assert_not_called()
+        self.assertContains(response, post.image.url)
+        self.assertEqual(set(cached_thumbnails(post.image).values()), {None})
+
+    def test_command_regenerates_thumbnails(self):
+        """Команда создаёт миниатюры для всех картинок"""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(text='text', author=user,
+                                   image=image_file())
+        call_command('regenerate_thumbnails', processes=1, force=True,
+                     stdout=StringIO())
+        self.assertNotIn(None, cached_thumbnails(post.image).values())
+
+
+@override_settings(MEDIA_ROOT=TESTMEDIA)
+class FeedThumbnailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(TESTMEDIA, ignore_errors=True)
+
+    def test_feed_does_not_resize_images(self):
+        """Лента без готовой миниатюры показывает исходную картинку"""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(text='text', author=user,
+                                   image=image_file())
+        response = Client().get(reverse('profile', args=[user.username]))
+        self.assertContains(response, post.image.url)
+        self.assertEqual(set(cached_thumbnails(post.image).values()), {None})
+
+    def test_page_thumbnails_are_looked_up_at_once(self):
+        """Миниатюры всей страницы читаются одним запросом"""
+        user = User.objects.create_user(username='author')
+        for number in range(5):
+            post = Post.objects.create(text='text', author=user,
+                                       image=image_file(color=(number, 0, 0)))
+            generate_thumbnails(post.image)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('profile', args=[user.username]))
+        self.assertEqual(len([
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]), 1)
+        self.assertContains(response, 'width="960" height="339"', count=5)
+
+    def test_missing_thumbnails_are_not_cached_for_long(self):
+        """Миниатюру, созданную другим процессом, лента скоро находит"""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(text='text', author=user,
+                                   image=image_file())
+        self.assertEqual(set(cached_thumbnails(post.image).values()), {None})
+        # другой процесс пишет в базу и в свой кеш, а не в наш
+        with mock.patch.object(KVStore, 'cache', LocMemCache('other', {})):
+            generate_thumbnails(post.image)
+        later = time.time() + MISS_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time',
+                        return_value=later):
+            self.assertNotIn(None, cached_thumbnails(post.image).values())
@@ -0,0 +1,148 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(text='old', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTests.reader)
+
+    def timeline_posts(self, user):
+        return list(TimelineEntry.objects.filter(user=user)
+                    .values_list('post__text', flat=True))
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает"""
+        self.reader_client.get(
+            reverse('profile_follow', args=[TimelineTests.author.username])
+        )
+        self.assertEqual(self.timeline_posts(TimelineTests.reader), ['old'])
+        self.reader_client.get(
+            reverse('profile_unfollow', args=[TimelineTests.author.username])
+        )
+        self.assertEqual(self.timeline_posts(TimelineTests.reader), [])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает только в ленты подписчиков"""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        author_client = Client()
+        author_client.force_login(TimelineTests.author)
+        author_client.post(reverse('new_post'), {'text': 'fresh'})
+        self.assertEqual(self.timeline_posts(TimelineTests.reader),
+                         ['fresh', 'old'])
+        self.assertEqual(self.timeline_posts(TimelineTests.stranger), [])
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual([post.text for post in response.context['page']],
+                         ['fresh', 'old'])
+
+    def test_rebuild_timelines_command(self):
+        """Команда пересобирает ленты по таблице подписок"""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(user=TimelineTests.stranger,
+                                     post=TimelineTests.old_post,
+                                     pub_date=TimelineTests.old_post.pub_date)
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline_posts(TimelineTests.reader), ['old'])
+        self.assertEqual(self.timeline_posts(TimelineTests.stranger), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_merged_on_read(self):
+        """Посты авторов-«звёзд» подмешиваются в ленту при чтении"""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        Follow.objects.create(user=TimelineTests.stranger,
+                              author=TimelineTests.author)
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=TimelineTests.reader, author=other)
+        Post.objects.create(text='celebrity', author=TimelineTests.author)
+        Post.objects.create(text='regular', author=other)
+        self.assertEqual(self.timeline_posts(TimelineTests.reader),
+                         ['regular', 'old'])
+        response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual([post.text for post in response.context['page']],
+                         ['regular', 'celebrity', 'old'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_former_celebrity_posts_stay_in_feeds(self):
+        """Посты бывшей «звезды» раскладывает команда, а не отписка"""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        Follow.objects.create(user=TimelineTests.stranger,
+                              author=TimelineTests.author)
+        Post.objects.create(text='celebrity', author=TimelineTests.author)
+        TimelineEntry.objects.filter(user=TimelineTests.stranger).delete()
+        with CaptureQueriesContext(connection) as queries:
+            Follow.objects.filter(user=TimelineTests.reader).delete()
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith('INSERT')])
+        stranger_client = Client()
+        stranger_client.force_login(TimelineTests.stranger)
+        response = stranger_client.get(reverse('follow_index'))
+        self.assertEqual([post.text for post in response.context['page']],
+                         ['celebrity', 'old'])
+        call_command('backfill_timelines', stdout=StringIO())
+        # раскладываются только посты, вышедшие после перехода предела
+        self.assertEqual(self.timeline_posts(TimelineTests.stranger),
+                         ['celebrity'])
+        self.assertIsNone(UserStats.objects.get(
+            user=TimelineTests.author
+        ).merged_since)
+        Post.objects.create(text='fresh', author=TimelineTests.author)
+        self.assertEqual(self.timeline_posts(TimelineTests.stranger),
+                         ['fresh', 'celebrity'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_feed_pages_merge_timeline_and_celebrities(self):
+        """Ленту с постами «звёзд» листают курсорами без повторов"""
+        Follow.objects.create(user=TimelineTests.reader,
+                              author=TimelineTests.author)
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=TimelineTests.reader, author=other)
+        for i in range(12):
+            Post.objects.create(text=f'other {i}', author=other)
+        # пост попал в ленту, пока автор ещё не был «звездой»
+        Follow.objects.create(user=TimelineTests.stranger,
+                              author=TimelineTests.author)
+        for i in range(12):
+            Post.objects.create(text=f'celebrity {i}',
+                                author=TimelineTests.author)
+        expected = list(Post.objects.filter(
+            author__in=[TimelineTests.author, other]
+        ).order_by('-pub_date', '-pk').values_list('pk', flat=True))
+        url = reverse('follow_index')
+        page = self.reader_client.get(url).context['page']
+        seen = [post.pk for post in page]
+        while page.has_next():
+            page = self.reader_client.get(
+                url, {'cursor': page.next_cursor}
+            ).context['page']
+            seen += [post.pk for post in page]
+        self.assertEqual(seen, expected)
+        back = self.reader_client.get(
+            url, {'cursor': page.previous_cursor}
+        ).context['page']
+        self.assertEqual([post.pk for post in back], expected[10:20])
+        numbered = self.reader_client.get(url, {'page': 3}).context['page']
+        self.assertEqual([post.pk for post in numbered], expected[20:])
+        self.assertEqual(numbered.paginator.count, len(expected))
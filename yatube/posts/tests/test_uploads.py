@@ -0,0 +1,141 @@
+import os
+import subprocess
+import sys
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.uploads import max_decoded_pixels
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+# интерпретатор, Django и Pillow уже загружены до замера,
+# остальное — мелкие объекты самой обработки
+RSS_SLACK = 4 * 1024 * 1024
+
+MEASURE_RSS = """
+import os
+import resource
+import sys
+from io import BytesIO
+
+import django
+from PIL import Image
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+django.setup()
+
+from django.test.utils import override_settings  # noqa: E402
+from posts.uploads import process_image  # noqa: E402
+
+path, side, pixels = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+override_settings(POST_IMAGE_MAX_SIDE=side,
+                  POST_IMAGE_MAX_PIXELS=pixels).enable()
+# первый проход по маленькой картинке загружает плагины Pillow
+with Image.open(path) as image:
+    warmup = BytesIO()
+    warmup.name = path
+    Image.new('RGB', (8, 8)).save(warmup, image.format)
+process_image(warmup).close()
+# пик памяти переживает exec, и этот процесс начинает с пика тестов;
+# у потомка пик отсчитывается от текущей памяти
+pid = os.fork()
+if pid:
+    sys.exit(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]))
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with open(path, 'rb') as upload:
+    process_image(upload).close()
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss в Linux считается в килобайтах
+print((after - before) * 1024, flush=True)
+os._exit(0)
+"""
+
+
+def uploaded_image(image, image_format, **params):
+    upload = TemporaryUploadedFile(f'image.{image_format.lower()}',
+                                   f'image/{image_format.lower()}', 0, None)
+    image.save(upload, image_format, **params)
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+class UploadTests(TestCase):
+    def clean_image(self, upload):
+        form = PostForm({'text': 'text'}, {'image': upload})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = form.cleaned_data['image']
+        return Image.open(BytesIO(image.read())), image.name
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_image_is_reencoded_without_metadata(self):
+        """Картинка уменьшается и пересохраняется без EXIF"""
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera'
+        upload = uploaded_image(Image.new('RGB', (400, 200)), 'JPEG',
+                                exif=exif.tobytes())
+        image, name = self.clean_image(upload)
+        self.assertEqual(name, 'image.jpg')
+        self.assertEqual(image.size, (100, 50))
+        self.assertNotIn('exif', image.info)
+
+    def test_transparent_image_keeps_alpha(self):
+        """Картинка с прозрачностью сохраняется в PNG"""
+        upload = uploaded_image(Image.new('RGBA', (10, 10)), 'PNG')
+        image, name = self.clean_image(upload)
+        self.assertEqual((name, image.mode), ('image.png', 'RGBA'))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels(self):
+        """Картинка больше лимита пикселей отклоняется"""
+        upload = uploaded_image(Image.new('RGB', (20, 10)), 'PNG')
+        form = PostForm({'text': 'text'}, {'image': upload})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['image'][0],
+                         'Картинка слишком большая: 20×10 пикселей')
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100, POST_IMAGE_MAX_PIXELS=640000)
+    def test_too_many_decoded_pixels(self):
+        """PNG, который пришлось бы декодировать целиком, отклоняется"""
+        upload = uploaded_image(Image.new('RGB', (300, 200)), 'PNG')
+        form = PostForm({'text': 'text'}, {'image': upload})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['image'][0],
+                         'Картинка слишком большая: 300×200 пикселей')
+        upload = uploaded_image(Image.new('RGB', (300, 200)), 'JPEG')
+        self.assertEqual(self.clean_image(upload)[0].size, (100, 67))
+
+    @override_settings(POST_IMAGE_MAX_SIDE=1024)
+    def test_peak_memory_is_bounded(self):
+        """Пиковая память процесса ограничена декодированной картинкой"""
+        # Pillow держит пиксель в 4 байтах; кроме декодированной картинки
+        # в памяти бывает её уменьшенная копия
+        limit = max_decoded_pixels() * 4 * 2 + RSS_SLACK
+        side = int(max_decoded_pixels() ** 0.5)
+        # целиком JPEG занял бы в памяти в несколько раз больше предела,
+        # а PNG декодируется целиком и лежит ровно на пределе
+        cases = [('JPEG', (6000, 5000)), ('PNG', (side, side))]
+        for image_format, size in cases:
+            with self.subTest(image_format=image_format), \
+                    NamedTemporaryFile() as upload:
+                Image.new('RGB', size, (255, 0, 0)).save(upload,
+                                                         image_format)
+                upload.flush()
+                self.assertLess(self.peak_rss(upload.name), limit)
+
+    def peak_rss(self, path):
+        """Прирост пиковой памяти отдельного процесса на обработку файла"""
+        result = subprocess.run(
+            [sys.executable, '-c', MEASURE_RSS, path,
+             str(settings.POST_IMAGE_MAX_SIDE),
+             str(settings.POST_IMAGE_MAX_PIXELS)],
+            cwd=BASE_DIR, check=True, stdout=subprocess.PIPE,
+        )
+        return int(result.stdout)
@@ -1,20 +1,25 @@
+import base64
+import json
 import shutil
 import tempfile
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.paginator import Page
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from http import HTTPStatus
 
 from time import sleep
 
-from posts.models import Group, Post, Follow
+from posts.models import Comment, Group, Post, Follow
 
 User = get_user_model()
 
@@ -229,6 +234,7 @@ class PostPageTests(TestCase):
         self.assertEqual(objects.paginator.count, 0)
 
     def test_index_cache(self):
+        self.authorized_client.get('/')
         Post.objects.create(
             text='new-post-with-cache',
             author=PostPageTests.user,
@@ -315,3 +321,97 @@ class PostPageTests(TestCase):
             responce1.context['page'][0].text,
             'text_user_3'
         )
+
+    def test_feed_query_count_does_not_depend_on_posts(self):
+        """Число запросов ленты не зависит от числа постов и комментариев"""
+        urls = PostPageTests.page_with_post_list + [reverse('follow_index')]
+        counts = {}
+        for url in urls:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client4.get(url)
+            counts[url] = len(queries)
+        for post in Post.objects.all()[:5]:
+            Comment.objects.create(
+                post=post,
+                author=PostPageTests.user2,
+                text='comment'
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client4.get(url)
+                self.assertEqual(len(queries), counts[url])
+                self.assertContains(response, 'Комментариев: 1')
+
+    def test_cursor_pagination(self):
+        """Ленты листаются курсорами вперёд и назад без COUNT(*)"""
+        for url in PostPageTests.page_with_post_list:
+            with self.subTest(url=url):
+                cache.clear()
+                first = self.guest_client.get(url).context['page']
+                self.assertIsNotNone(first.next_cursor)
+                self.assertIsNone(first.previous_cursor)
+                # первый запрос заодно создаёт миниатюры картинок
+                self.guest_client.get(url, {'page': 2})
+                cache.clear()
+                with CaptureQueriesContext(connection) as numbered:
+                    self.guest_client.get(url, {'page': 2})
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(
+                        url, {'cursor': first.next_cursor}
+                    )
+                second = response.context['page']
+                self.assertEqual(
+                    [post.text for post in second],
+                    ['text2', 'text1', 'text0']
+                )
+                self.assertFalse(second.has_next())
+                self.assertFalse(any(
+                    'OFFSET' in query['sql'] for query in queries
+                ))
+                self.assertEqual(
+                    len(queries), len(numbered) - 1,
+                    'Курсорная страница не должна считать COUNT(*)'
+                )
+                back = self.guest_client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page']
+                self.assertEqual(
+                    [post.pk for post in back], [post.pk for post in first]
+                )
+                self.assertFalse(back.has_previous())
+
+    def test_first_page_does_not_count_posts(self):
+        """Первая страница ленты без ?page не считает COUNT(*) и OFFSET"""
+        urls = PostPageTests.page_with_post_list + [reverse('follow_index')]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client4.get(url)
+                self.assertIsInstance(response.context['page'], Page)
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'COUNT(*)' in query['sql'] or 'OFFSET' in query['sql']
+                ])
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Испорченный курсор показывает первую страницу"""
+        url = reverse('group_posts', args=[PostPageTests.group1.slug])
+        tampered = [['a', values] for values in (
+            ['x', 'abc'], [None, 1], {'a': 1}, 'a',
+            ['2020-13-45T00:00:00', 1], ['2020-01-01T00:00:00', '1'],
+            ['2020-01-01T00:00:00', True],
+        )]
+        cursors = ['broken!'] + [
+            base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+            for raw in tampered
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.context['page'][0].text, 'text12')
@@ -0,0 +1,200 @@
+"""
+Миниатюры картинок постов.
+
+Все размеры из settings.POST_THUMBNAILS создаются в фоновых потоках
+сразу после сохранения поста. При рендеринге лент миниатюры только
+ищутся в хранилище sorl-thumbnail, причём для всей страницы сразу:
+одним get_many в кеше и одним запросом к базе для промахов. Если
+миниатюры ещё нет, карточка показывает исходную картинку, а миниатюра
+ставится в очередь фоновых потоков, если они включены.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore
+
+logger = logging.getLogger(__name__)
+
+# сколько секунд помнить, что миниатюры ещё нет
+MISS_TIMEOUT = 5
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class LookupBackend(ThumbnailBackend):
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, который создал бы get_thumbnail, без записи."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = LookupBackend()
+
+
+def _lookup_raw(keys):
+    """
+    Значения ключей хранилища sorl одним get_many и одним запросом.
+
+    Повторяет cached_db KVStore._get_raw, но для всех ключей сразу.
+    """
+    store = default.kvstore
+    found = store.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(KVStore.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        store.cache.set_many(stored,
+                             thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        # в отличие от sorl отсутствие кешируем ненадолго: миниатюру
+        # может создать другой процесс, и этот о ней не узнает
+        store.cache.set_many(
+            {key: EMPTY_VALUE for key in missing if key not in stored},
+            MISS_TIMEOUT,
+        )
+        found.update(stored)
+    return {key: value for key, value in found.items()
+            if value != EMPTY_VALUE}
+
+
+def lookup_thumbnails(files):
+    """Готовые миниатюры из списка файлов: {ключ файла: ImageFile}."""
+    files = list(files)
+    if not files:
+        return {}
+    if not isinstance(default.kvstore, CachedDBStore):
+        # остальные хранилища sorl читаем по одному ключу
+        thumbnails = {file.key: default.kvstore.get(file) for file in files}
+        return {key: image for key, image in thumbnails.items() if image}
+    raw = _lookup_raw([add_prefix(file.key) for file in files])
+    return {
+        file.key: deserialize_image_file(raw[add_prefix(file.key)])
+        for file in files if add_prefix(file.key) in raw
+    }
+
+
+def thumbnail_files(image):
+    """Файлы всех миниатюр картинки: {имя: ImageFile}."""
+    return {
+        name: backend.get_thumbnail_file(image, geometry, **options)
+        for name, (geometry, options) in settings.POST_THUMBNAILS.items()
+    }
+
+
+def cached_thumbnails(image):
+    """Готовые миниатюры картинки: {имя: ImageFile или None}."""
+    files = thumbnail_files(image)
+    found = lookup_thumbnails(files.values())
+    return {name: found.get(file.key) for name, file in files.items()}
+
+
+def attach_thumbnails(posts):
+    """
+    Подставляет постам готовые миниатюры в post.thumbnails.
+
+    Миниатюры всех постов страницы ищутся одним обращением к кешу,
+    так что шаблон только читает готовые url и размеры. Недостающие
+    миниатюры не создаются внутри запроса, а ставятся в очередь
+    фоновых потоков; без них карточка просто показывает исходную
+    картинку.
+    """
+    posts = list(posts)
+    files = {
+        post.pk: thumbnail_files(post.image) for post in posts if post.image
+    }
+    found = lookup_thumbnails(
+        [file for post_files in files.values() for file in post_files.values()]
+    )
+    for post in posts:
+        post.thumbnails = {
+            name: found.get(file.key)
+            for name, file in files.get(post.pk, {}).items()
+        }
+        if None in post.thumbnails.values():
+            queue_thumbnails(post.image)
+    return posts
+
+
+def generate_thumbnails(image):
+    """Создаёт недостающие миниатюры картинки всех размеров."""
+    for geometry, options in settings.POST_THUMBNAILS.values():
+        backend.get_thumbnail(image, geometry, **options)
+
+
+def _generate(image):
+    try:
+        generate_thumbnails(image)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image.name)
+    finally:
+        with _lock:
+            _pending.discard(image.name)
+        if settings.POST_THUMBNAIL_WORKERS:
+            # у каждого фонового потока своё соединение с базой
+            connection.close()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.POST_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def _submit(image):
+    with _lock:
+        if image.name in _pending:
+            return
+        _pending.add(image.name)
+    if settings.POST_THUMBNAIL_WORKERS:
+        _get_executor().submit(_generate, image)
+    else:
+        _generate(image)
+
+
+def schedule_thumbnails(image):
+    """Создаёт миниатюры в фоне после коммита текущей транзакции."""
+    if image:
+        transaction.on_commit(lambda: _submit(image))
+
+
+def queue_thumbnails(image):
+    """
+    Отдаёт недостающие миниатюры фоновым потокам, если они есть.
+
+    Без потоков (POST_THUMBNAIL_WORKERS = 0) читающий запрос ничего
+    не создаёт: в autocommit on_commit выполнился бы сразу, и лента
+    пережимала бы картинки внутри ответа.
+    """
+    if image and settings.POST_THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _submit(image))
+
+
+def thumbnails_ready(post):
+    return None not in getattr(post, 'thumbnails', {}).values()
@@ -0,0 +1,281 @@
+"""
+Ленты подписок с гибридной раскладкой.
+
+Посты обычных авторов раскладываются по лентам подписчиков при
+публикации. Когда у автора становится больше TIMELINE_FANOUT_LIMIT
+подписчиков, он получает отметку UserStats.merged_since, и его новые
+посты не раскладываются, а подмешиваются в ленту при чтении. Отметка
+снимается не сразу, как подписчиков стало меньше, а командой
+backfill_timelines: она вне запросов раскладывает посты, которые
+вышли, пока автор был «звездой», и только потом снимает отметку.
+
+Страница ленты (FeedPaginator) собирается из нескольких диапазонов,
+каждый из которых читается по своему индексу: записи ленты — по
+timeline_user_date_idx, посты каждой «звезды» — по
+post_author_date_idx. Диапазоны сливаются по (pub_date, id), и посты
+страницы достаются уже по первичному ключу.
+"""
+import heapq
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Follow, Post, TimelineEntry, User, UserStats
+from .pagination import (AFTER, FEED_ORDERING, CursorPaginator,
+                         reverse_ordering, seek)
+
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+
+
+def is_merged(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id, merged_since__isnull=False
+    ).exists()
+
+
+def celebrity_ids(user_id):
+    """Авторы из подписок пользователя, посты которых подмешиваются."""
+    return list(UserStats.objects.filter(
+        user__following__user_id=user_id,
+        merged_since__isnull=False,
+    ).values_list('user_id', flat=True))
+
+
+def start_merging(author_id):
+    """Отмечает автора, у которого подписчиков стало больше предела."""
+    UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        merged_since__isnull=True,
+    ).update(merged_since=timezone.now())
+
+
+def unique_keys(keys):
+    """Пропускает повторы: пост «звезды» мог попасть и в ленту."""
+    previous = None
+    for key in keys:
+        if key != previous:
+            yield key
+        previous = key
+
+
+class FeedSequence:
+    """Лента подписок как последовательность для обычного Paginator."""
+
+    def __init__(self, paginator):
+        self.paginator = paginator
+
+    def count(self):
+        return self.paginator.count_posts()
+
+    def __getitem__(self, key):
+        # срез [n:n + 10] — первые n + 10 постов ленты без первых n;
+        # дальние страницы дороже, но ими ходят только старые ссылки
+        return self.paginator.fetch(key.stop)[key.start:]
+
+
+class FeedPaginator(CursorPaginator):
+    """Курсорный вывод ленты подписок user_id без OFFSET и сортировки."""
+
+    def __init__(self, user_id, post_list, per_page):
+        super().__init__(post_list, per_page, FEED_ORDERING)
+        self.user_id = user_id
+
+    def sequence(self):
+        return FeedSequence(self)
+
+    @cached_property
+    def celebrities(self):
+        return celebrity_ids(self.user_id)
+
+    def ranges(self):
+        """(queryset ключей (pub_date, id), его ключ сортировки)."""
+        yield (TimelineEntry.objects.filter(user_id=self.user_id)
+               .values_list('pub_date', 'post_id'), TIMELINE_ORDERING)
+        for author_id in self.celebrities:
+            yield (Post.objects.filter(author_id=author_id)
+                   .values_list('pub_date', 'pk'), FEED_ORDERING)
+
+    def count_posts(self):
+        count = TimelineEntry.objects.filter(user_id=self.user_id).count()
+        if self.celebrities:
+            # посты «звёзд», которые уже лежат в ленте, не считаем дважды
+            count += Post.objects.filter(
+                author_id__in=self.celebrities
+            ).exclude(timeline_entries__user_id=self.user_id).count()
+        return count
+
+    def fetch(self, limit, values=None, direction=AFTER):
+        parts = []
+        for queryset, ordering in self.ranges():
+            if values is not None:
+                queryset = queryset.filter(seek(ordering, values, direction))
+            if direction != AFTER:
+                ordering = reverse_ordering(ordering)
+            parts.append(list(queryset.order_by(*ordering)[:limit]))
+        keys = list(islice(unique_keys(
+            heapq.merge(*parts, reverse=direction == AFTER)
+        ), limit))
+        posts = self.object_list.in_bulk([pk for pub_date, pk in keys])
+        return [posts[pk] for pub_date, pk in keys if pk in posts]
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_merged(post.author_id):
+        return
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                 .values_list('user_id', flat=True).distinct())
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """
+    Добавляет в ленту последние посты автора, на которого подписались.
+    Посты «звезды» тоже раскладываются: это одна лента, зато после
+    снятия отметки merged_since дораскладывать придётся только новые.
+    """
+    posts = (Post.objects.filter(author_id=author_id)
+             .order_by('-pub_date', '-pk')
+             .values_list('pk', 'pub_date')
+             [:settings.TIMELINE_BACKFILL_LIMIT])
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        return
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+BACKFILL_FOLLOWERS = """
+    INSERT INTO {timeline} (user_id, post_id, pub_date)
+    SELECT follow.user_id, post.id, post.pub_date
+    FROM {follow} follow
+    CROSS JOIN (
+        SELECT id, pub_date FROM {post}
+        WHERE author_id = %s AND pub_date >= %s
+        ORDER BY pub_date DESC, id DESC LIMIT %s
+    ) post
+    WHERE follow.author_id = %s
+        AND follow.user_id > %s AND follow.user_id <= %s
+    ON CONFLICT DO NOTHING
+"""
+
+
+def backfill_followers(author_id, since):
+    """
+    Раскладывает посты автора, опубликованные с момента since,
+    по лентам подписчиков: по TIMELINE_BATCH_SIZE подписчиков
+    за один INSERT ... SELECT.
+    """
+    sql = BACKFILL_FOLLOWERS.format(
+        timeline=TimelineEntry._meta.db_table,
+        follow=Follow._meta.db_table,
+        post=Post._meta.db_table,
+    )
+    since = connection.ops.adapt_datetimefield_value(since)
+    followers = (Follow.objects.filter(author_id=author_id)
+                 .order_by('user_id').values_list('user_id', flat=True))
+    previous, batch = 0, []
+    for user_id in chain(followers.iterator(), [None]):
+        if user_id is not None:
+            batch.append(user_id)
+            if len(batch) < settings.TIMELINE_BATCH_SIZE:
+                continue
+        if not batch:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [
+                author_id, since, settings.TIMELINE_BACKFILL_LIMIT,
+                author_id, previous, batch[-1],
+            ])
+        previous, batch = batch[-1], []
+
+
+def finish_merging():
+    """
+    Раскладывает посты авторов, у которых подписчиков снова не больше
+    предела, и снимает с них отметку merged_since. Возвращает число
+    таких авторов.
+    """
+    authors = list(UserStats.objects.filter(
+        merged_since__isnull=False,
+        followers_count__lte=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('user_id', 'merged_since'))
+    finished = 0
+    for author_id, since in authors:
+        started = timezone.now()
+        backfill_followers(author_id, since)
+        # если автор за это время снова перешёл предел, отметка остаётся
+        if not UserStats.objects.filter(
+            user_id=author_id, merged_since=since,
+            followers_count__lte=settings.TIMELINE_FANOUT_LIMIT,
+        ).update(merged_since=None):
+            continue
+        # посты, вышедшие во время раскладки, fan_out ещё пропускал
+        backfill_followers(author_id, started)
+        finished += 1
+    return finished
+
+
+BACKFILL_ALL = """
+    INSERT INTO {timeline} (user_id, post_id, pub_date)
+    SELECT follow.user_id, post.id, post.pub_date
+    FROM {follow} follow
+    JOIN (
+        SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+            PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+        ) AS position
+        FROM {post}
+    ) post ON post.author_id = follow.author_id AND post.position <= %s
+    LEFT JOIN {stats} stats ON stats.user_id = follow.author_id
+    WHERE COALESCE(stats.followers_count, 0) <= %s
+"""
+
+
+def backfill_all():
+    """То же, что backfill для каждой подписки, одним INSERT ... SELECT."""
+    sql = BACKFILL_ALL.format(
+        timeline=TimelineEntry._meta.db_table,
+        follow=Follow._meta.db_table,
+        post=Post._meta.db_table,
+        stats=UserStats._meta.db_table,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [settings.TIMELINE_BACKFILL_LIMIT,
+                             settings.TIMELINE_FANOUT_LIMIT])
+
+
+def rebuild():
+    """Пересобирает все ленты с нуля по таблице подписок."""
+    TimelineEntry.objects.all().delete()
+    backfill_all()
+    # посты «звёзд» backfill_all не раскладывает, поэтому у них
+    # отметка ставится с регистрации, а у остальных снимается
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    UserStats.objects.filter(followers_count__gt=limit).update(
+        merged_since=Subquery(
+            User.objects.filter(pk=OuterRef('user')).values('date_joined')
+        )
+    )
+    UserStats.objects.filter(
+        followers_count__lte=limit, merged_since__isnull=False
+    ).update(merged_since=None)
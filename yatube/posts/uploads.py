@@ -0,0 +1,73 @@
+"""
+Обработка загруженных картинок постов.
+
+Файл загрузки уже лежит на диске (см. FILE_UPLOAD_HANDLERS), Pillow
+читает из него только заголовок, чтобы проверить число пикселей до
+декодирования. Затем картинка декодируется, уменьшается,
+поворачивается по EXIF и пересохраняется без метаданных в JPEG, а с
+прозрачностью в PNG. Оба кодировщика пишут файл блоками; WebP в
+Pillow сначала копирует в память всю картинку.
+
+Память на обработку определяется декодированной картинкой. JPEG
+декодируется сразу в 1/2, 1/4 или 1/8 размера, остальные форматы
+(PNG, GIF) только целиком, поэтому их принимаем не больше
+max_decoded_pixels() пикселей.
+"""
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+# сколько байт пережатой картинки держать в памяти до сброса на диск
+SPOOL_SIZE = 256 * 1024
+
+
+def max_decoded_pixels():
+    """Сколько пикселей можно декодировать ради одной картинки."""
+    side = settings.POST_IMAGE_MAX_SIDE
+    # JPEG уменьшается при декодировании не больше чем в 8 раз по стороне
+    return max(4 * side * side, settings.POST_IMAGE_MAX_PIXELS // 64)
+
+
+def check_pixels(image, limit):
+    width, height = image.size
+    if width * height > limit:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s пикселей',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def shrink(image):
+    side = settings.POST_IMAGE_MAX_SIDE
+    width, height = image.size
+    scale = min(1, side / max(width, height))
+    # JPEG декодируется сразу в меньшем масштабе, но не меньше итогового
+    # размера; draft других форматов ничего не делает
+    image.draft('RGB', (max(1, int(width * scale)),
+                        max(1, int(height * scale))))
+    check_pixels(image, max_decoded_pixels())
+    image.thumbnail((side, side))
+    # поворачиваем уже уменьшенную картинку: exif_transpose её копирует
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        return image.convert('RGBA'), 'PNG', 'png'
+    return image.convert('RGB'), 'JPEG', 'jpg'
+
+
+def process_image(uploaded):
+    """Проверяет загруженную картинку и возвращает пережатый файл."""
+    uploaded.seek(0)
+    with Image.open(uploaded) as image:
+        check_pixels(image, settings.POST_IMAGE_MAX_PIXELS)
+        image, image_format, extension = shrink(image)
+    output = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    # новые метаданные не передаём, поэтому EXIF и прочие в файл не попадут
+    image.save(output, image_format, quality=settings.POST_IMAGE_QUALITY)
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(uploaded.name))[0]
+    return File(output, name=f'{name}.{extension}')
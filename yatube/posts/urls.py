@@ -9,6 +9,7 @@ urlpatterns = [
     path("new/", views.new_post, name="new_post"),
     path("group/", views.group_list, name="group_list"),
     path("user/", views.user_list, name="user_list"),
+    path("search/", views.search, name="search"),
     path("group/<slug:slug>/", views.group_posts, name="group_posts"),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
@@ -22,6 +23,11 @@ urlpatterns = [
         views.add_comment,
         name="add_comment"
     ),
+    path(
+        "<str:username>/export/",
+        views.export_posts,
+        name="export_posts"
+    ),
     path(
         "<str:username>/follow/",
         views.profile_follow,
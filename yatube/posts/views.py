@@ -1,49 +1,91 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
-
+from django.views.decorators.http import condition
+
+from . import timeline
+from .cache import bump_feed_versions, cache_feed, index_scope, post_scopes
+from .cards import attach_cards
+from .conditional import follow_etag, group_etag, post_etag, profile_etag
+from .counters import get_user_stats
+from .export import FORMATS, export_lines
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .pagination import CursorPaginator, add_cursors
+from .search import SearchPaginator
+from .thumbnails import attach_thumbnails, schedule_thumbnails
 
 User = get_user_model()
 
 
+def with_card_data(post_list):
+    # Всё, что нужно карточке поста, достаём одним запросом:
+    # автора и группу через JOIN, число комментариев хранится в посте
+    return post_list.select_related('author', 'group')
+
+
 def paginator(request, lst):
     paginator = Paginator(lst, 10)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
-@cache_page(20, key_prefix='index_page')
+def feed_paginator(request, post_list, cursor_paginator=None):
+    # лента листается курсорами без OFFSET и COUNT(*); ?page=N
+    # оставлен только для совместимости со старыми ссылками
+    if cursor_paginator is None:
+        cursor_paginator = CursorPaginator(post_list, 10)
+    cursor = request.GET.get('cursor')
+    if cursor is None and 'page' in request.GET:
+        page = add_cursors(paginator(request, cursor_paginator.sequence()))
+    else:
+        page = cursor_paginator.get_page(cursor)
+    page.object_list = attach_cards(page.object_list)
+    return page
+
+
+@cache_feed(20, index_scope)
 def index(request):
-    post_list = Post.objects.all()
-    page = paginator(request, post_list)
+    post_list = with_card_data(Post.objects.all())
+    page = feed_paginator(request, post_list)
     return render(request,
                   'posts/index.html',
                   {'page': page, }
                   )
 
 
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page = paginator(request, post_list)
+    post_list = with_card_data(group.posts.all())
+    page = feed_paginator(request, post_list)
     return render(request, "posts/group.html", {"group": group, "page": page})
 
 
+def search(request):
+    query = request.GET.get("q", "")
+    post_list = with_card_data(Post.objects.all())
+    page = SearchPaginator(query, post_list, 10).get_page(
+        request.GET.get("cursor")
+    )
+    page.object_list = attach_cards(page.object_list)
+    return render(request, "posts/search.html",
+                  {"page": page, "query": query})
+
+
 def group_list(request):
     groups = Group.objects.all()
     groups = paginator(request, groups)
     return render(request, "posts/groups_list.html", {"groups": groups})
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
     user = get_object_or_404(User, username=username)
-    post_list = user.posts.all()
-    page = paginator(request, post_list)
+    post_list = with_card_data(user.posts.all())
+    page = feed_paginator(request, post_list)
     following = False
     if request.user.is_authenticated:
         if Follow.objects.filter(
@@ -53,14 +95,20 @@ def profile(request, username):
             following = True
     content = {
         "user_post": user,
+        "stats": get_user_stats(user),
         "page": page,
         "following": following,
     }
     return render(request, 'posts/profile.html', content)
 
 
+@condition(etag_func=post_etag)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id, author__username=username)
+    post = get_object_or_404(
+        with_card_data(Post.objects.all()),
+        pk=post_id,
+        author__username=username
+    )
     user = post.author
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -70,9 +118,11 @@ def post_view(request, username, post_id):
         comment.save()
         return redirect("post", username=username, post_id=post_id)
 
-    comments = post.comments.all()
+    attach_thumbnails([post])
+    comments = post.comments.select_related('author')
     content = {
         "user_post": user,
+        "stats": get_user_stats(user),
         "post": post,
         "form": form,
         "comments": comments,
@@ -95,21 +145,30 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
-        cache.clear()
+        schedule_thumbnails(post.image)
+        bump_feed_versions(*post_scopes(post))
         return redirect("/")
     return render(request, "posts/new_post.html", {"form": form})
 
 
 @login_required
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        author__username=username,
+        pk=post_id
+    )
     if request.user != post.author:
         return redirect("/")
+    old_scopes = post_scopes(post)
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
                     instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post.image)
+        bump_feed_versions(*old_scopes, *post_scopes(post))
         return redirect("post", username=username, post_id=post_id)
     return render(
         request, "posts/post_edit.html",
@@ -146,14 +205,35 @@ def add_comment(request, username, post_id):
 
 
 @login_required
+@condition(etag_func=follow_etag)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page = paginator(request, post_list)
+    post_list = with_card_data(Post.objects.all())
+    page = feed_paginator(request, post_list, timeline.FeedPaginator(
+        request.user.pk, post_list, 10
+    ))
     return render(request,
                   'posts/follow.html',
                   {'page': page, })
 
 
+@login_required
+def export_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        return redirect("profile", username=username)
+    export_format = request.GET.get("format")
+    if export_format not in FORMATS:
+        export_format = "ndjson"
+    response = StreamingHttpResponse(
+        export_lines(author, export_format, request.build_absolute_uri),
+        content_type=FORMATS[export_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{username}.{export_format}"'
+    )
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     user = get_object_or_404(User, username=username)
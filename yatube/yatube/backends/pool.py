@@ -0,0 +1,214 @@
+"""
+Пул соединений с базой внутри процесса.
+
+Django держит по соединению на поток: с CONN_MAX_AGE = 0 оно
+открывается и закрывается на каждый запрос, с CONN_MAX_AGE > 0
+каждый поток держит своё, даже когда простаивает. Бэкенды
+yatube.backends.postgresql и yatube.backends.sqlite3 вместо этого
+берут соединение из пула процесса при первом запросе к базе и
+возвращают в конце ответа, так что соединений у воркера не больше
+POOL['SIZE'], а открываются они только когда пул пуст.
+
+Соединение, которое простояло в пуле дольше POOL['CHECK_AFTER'] секунд,
+перед выдачей проверяется запросом SELECT 1 (база могла его закрыть),
+а старше CONN_MAX_AGE секунд закрывается и открывается заново.
+Если все соединения заняты, поток ждёт освободившееся
+не дольше POOL['TIMEOUT'] секунд.
+
+    DATABASES = {'default': {
+        'ENGINE': 'yatube.backends.postgresql',
+        'CONN_MAX_AGE': 300,
+        'POOL': {'SIZE': 4, 'TIMEOUT': 10, 'CHECK_AFTER': 10},
+        ...
+    }}
+"""
+import os
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+POOL_DEFAULTS = {'SIZE': 4, 'TIMEOUT': 10, 'CHECK_AFTER': 10}
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+def ping(connection):
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+    except Exception:
+        return False
+    return True
+
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """Соединения DB-API: свободные лежат стопкой, новые — по требованию."""
+
+    def __init__(self, size, timeout=10, check_after=10, max_age=None,
+                 check=ping):
+        self.size = size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_age = max_age
+        self.check = check
+        self.condition = threading.Condition()
+        # (соединение, когда открыто, когда возвращено); последнее
+        # возвращённое выдаём первым — оно точно живое
+        self.idle = []
+        # id соединения -> когда открыто; opening — открываются сейчас
+        self.opened = {}
+        self.opening = 0
+        self.stats = {'connects': 0, 'reuses': 0, 'checks': 0,
+                      'discarded': 0, 'waits': 0}
+
+    def expired(self, opened, now):
+        return self.max_age is not None and now - opened >= self.max_age
+
+    def acquire(self, connect):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            taken = self.take(deadline)
+            if taken is None:
+                return self.open(connect)
+            connection, returned = taken
+            if time.monotonic() - returned < self.check_after:
+                return connection
+            self.count('checks')
+            if self.check(connection):
+                return connection
+            self.discard(connection)
+
+    def count(self, name):
+        with self.condition:
+            self.stats[name] += 1
+
+    def take(self, deadline):
+        """Свободное соединение, None — можно открыть новое."""
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                while self.idle:
+                    connection, opened, returned = self.idle.pop()
+                    if not self.expired(opened, now):
+                        self.stats['reuses'] += 1
+                        return connection, returned
+                    self.forget(connection)
+                if len(self.opened) + self.opening < self.size:
+                    # место занимаем сразу, открываем уже без блокировки
+                    self.opening += 1
+                    return None
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f'Все {self.size} соединений пула заняты '
+                        f'дольше {self.timeout} с'
+                    )
+                self.stats['waits'] += 1
+                self.condition.wait(remaining)
+
+    def open(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opening -= 1
+            self.opened[id(connection)] = time.monotonic()
+            self.stats['connects'] += 1
+        return connection
+
+    def release(self, connection, discard=False):
+        now = time.monotonic()
+        with self.condition:
+            opened = self.opened.get(id(connection))
+            if opened is None:
+                # соединение не из этого пула (например, открыто до fork)
+                close_quietly(connection)
+                return
+            if discard or self.expired(opened, now):
+                self.forget(connection)
+            else:
+                self.idle.append((connection, opened, now))
+            self.condition.notify()
+
+    def discard(self, connection):
+        with self.condition:
+            self.forget(connection)
+            self.condition.notify()
+
+    def forget(self, connection):
+        """Закрывает соединение и освобождает его место; под блокировкой."""
+        self.opened.pop(id(connection), None)
+        self.stats['discarded'] += 1
+        close_quietly(connection)
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(wrapper):
+    """Пул процесса для базы wrapper; после fork — новый."""
+    # в ключе и параметры базы: служебное соединение Django к базе
+    # postgres и тестовая база живут под тем же alias
+    key = (os.getpid(), wrapper.alias) + tuple(
+        wrapper.settings_dict.get(name) for name in
+        ('NAME', 'HOST', 'PORT', 'USER')
+    )
+    pool = pools.get(key)
+    if pool is None:
+        with pools_lock:
+            pool = pools.get(key)
+            if pool is None:
+                options = dict(POOL_DEFAULTS,
+                               **wrapper.settings_dict.get('POOL', {}))
+                pool = pools[key] = ConnectionPool(
+                    size=options['SIZE'],
+                    timeout=options['TIMEOUT'],
+                    check_after=options['CHECK_AFTER'],
+                    max_age=wrapper.settings_dict['CONN_MAX_AGE'],
+                )
+    return pool
+
+
+class PooledConnectionMixin:
+    """Примесь к DatabaseWrapper: соединения берутся из пула процесса."""
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        return get_pool(self).acquire(lambda: connect(conn_params))
+
+    def connect(self):
+        super().connect()
+        # CONN_MAX_AGE здесь — время жизни соединения в пуле, а поток
+        # отдаёт соединение обратно в конце каждого запроса
+        self.close_at = time.time()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        discard = self.errors_occurred and not self.is_usable()
+        if not discard:
+            try:
+                # незавершённая транзакция не должна достаться
+                # следующему потоку; в autocommit это ничего не стоит
+                self.connection.rollback()
+            except Exception:
+                discard = True
+        get_pool(self).release(self.connection, discard)
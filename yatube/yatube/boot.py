@@ -0,0 +1,123 @@
+"""
+Подготовка к старту контейнера без лишней работы.
+
+Перед gunicorn нужно собрать статику, применить миграции и загрузить
+дамп, но после перезапуска всё это обычно уже сделано. Каждый шаг
+сначала проверяет, есть ли ему что делать:
+
+- collectstatic — по sha256 всех исходных файлов статики (всё, что
+  видят STATICFILES_FINDERS) и хранилища STATICFILES_STORAGE;
+  отпечаток последней сборки лежит файлом в STATIC_ROOT, поэтому
+  пустой том статики собирается заново;
+- migrate — по плану миграций: применённые миграции из базы
+  сравниваются с миграциями на диске;
+- import_dump — по отпечатку дампа, см. posts.importer.
+
+Статика не зависит от базы, поэтому собирается в отдельном потоке
+одновременно с миграциями; загрузка дампа идёт после миграций.
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+STAMP = '.collected'
+# те же шаблоны, что collectstatic пропускает по умолчанию
+IGNORE_PATTERNS = ['CVS', '.*', '*~']
+
+SKIPPED = 'пропущено'
+
+
+def static_fingerprint():
+    """sha256 путей и содержимого всех исходных файлов статики."""
+    files = {}
+    for finder in get_finders():
+        for path, storage in finder.list(IGNORE_PATTERNS):
+            prefix = getattr(storage, 'prefix', None)
+            name = os.path.join(prefix, path) if prefix else path
+            # как и collectstatic, берём первый найденный файл
+            files.setdefault(name, (storage, path))
+    digest = hashlib.sha256(settings.STATICFILES_STORAGE.encode())
+    for name in sorted(files):
+        storage, path = files[name]
+        digest.update(b'\0' + name.encode() + b'\0')
+        with storage.open(path) as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def stamp_path():
+    return os.path.join(settings.STATIC_ROOT, STAMP)
+
+
+def collect_static(force=False):
+    fingerprint = static_fingerprint()
+    try:
+        with open(stamp_path()) as file:
+            collected = file.read().strip()
+    except OSError:
+        collected = None
+    if collected == fingerprint and not force:
+        return SKIPPED
+    output = StringIO()
+    call_command('collectstatic', interactive=False, stdout=output)
+    with open(stamp_path(), 'w') as file:
+        file.write(fingerprint)
+    return output.getvalue().strip().splitlines()[-1]
+
+
+def migrate(force=False):
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if not plan and not force:
+        return SKIPPED
+    call_command('migrate', interactive=False, verbosity=0)
+    return f'применено миграций: {len(plan)}'
+
+
+def import_dump(path, force=False):
+    # импорт здесь, чтобы модуль не тянул модели posts при загрузке
+    from posts.importer import Importer
+
+    counts = Importer(path, force=force).run()
+    if counts is None:
+        return SKIPPED
+    return f'загружено объектов: {sum(counts.values())}'
+
+
+def run_chain(steps, log):
+    """Шаги одной цепочки по очереди; каждый поток со своим соединением."""
+    timings = []
+    try:
+        for name, step in steps:
+            started = time.perf_counter()
+            result = step()
+            elapsed = time.perf_counter() - started
+            log(f'{name}: {result} ({elapsed:.2f} с)')
+            timings.append((name, result, elapsed))
+    finally:
+        connection.close()
+    return timings
+
+
+def boot(dump=None, force=False, log=None):
+    """
+    Выполняет шаги, которым есть что делать, и возвращает
+    [(шаг, результат, секунды)] по цепочкам.
+    """
+    log = log or (lambda message: None)
+    database = [('migrate', lambda: migrate(force))]
+    if dump:
+        database.append(('import_dump', lambda: import_dump(dump, force)))
+    chains = [[('collectstatic', lambda: collect_static(force))], database]
+    with ThreadPoolExecutor(len(chains)) as pool:
+        futures = [pool.submit(run_chain, chain, log) for chain in chains]
+        # result() пробрасывает ошибку шага, и контейнер не стартует
+        return [timing for future in futures for timing in future.result()]
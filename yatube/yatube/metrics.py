@@ -0,0 +1,343 @@
+"""
+Метрики запросов в формате Prometheus.
+
+MetricsMiddleware замеряет каждый запрос и относит его к имени
+маршрута (resolver_match.view_name): время ответа, число запросов
+к базе и их суммарное время, время рендеринга шаблонов и попадания
+в кеш. Всё складывается в гистограммы и счётчики в памяти процесса,
+а страница /metrics/ отдаёт их в текстовом формате Prometheus.
+
+Воркеры gunicorn — отдельные процессы, поэтому каждый не чаще раза
+в METRICS_FLUSH_INTERVAL секунд сбрасывает свои метрики в файл
+в METRICS_DIR, а страница метрик складывает файлы всех воркеров.
+Без METRICS_DIR видны метрики только того процесса, что ответил.
+
+Время шаблонов считает бэкенд TimedDjangoTemplates:
+
+    TEMPLATES = [{'BACKEND': 'yatube.metrics.TimedDjangoTemplates', ...}]
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+
+PREFIX = 'yatube'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Время ответа на запрос', DURATION_BUCKETS),
+    'db_queries': ('Запросов к базе на один ответ', QUERY_BUCKETS),
+    'db_duration_seconds': (
+        'Суммарное время запросов к базе на один ответ', DURATION_BUCKETS),
+    'template_render_seconds': (
+        'Время рендеринга шаблонов на один ответ', DURATION_BUCKETS),
+}
+COUNTERS = {
+    'requests_total': 'Число ответов',
+    'cache_requests_total': 'Обращения к кешу, result=hit|miss',
+}
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time', 'hits', 'misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.hits = 0
+        self.misses = 0
+
+
+current = contextvars.ContextVar('request_stats', default=None)
+
+
+class Registry:
+    """Гистограммы и счётчики одного процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.flushed = time.monotonic()
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                # счётчики по корзинам, затем сумма и число наблюдений
+                series = self.histograms[key] = [0] * (len(buckets) + 2)
+            for number, bound in enumerate(buckets):
+                if value <= bound:
+                    series[number] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def inc(self, name, labels, value=1):
+        if not value:
+            return
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': [[name, list(labels), list(series)]
+                               for (name, labels), series
+                               in self.histograms.items()],
+                'counters': [[name, list(labels), value]
+                             for (name, labels), value
+                             in self.counters.items()],
+            }
+
+    def maybe_flush(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        write_snapshot(directory, self.snapshot())
+
+
+registry = Registry()
+
+
+def write_snapshot(directory, snapshot):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    # пишем во временный файл и переименовываем, чтобы читатель
+    # никогда не увидел файл наполовину
+    with open(path + '.tmp', 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(path + '.tmp', path)
+
+
+def read_snapshots(directory):
+    """Снимки всех воркеров, текущий процесс — по живым данным."""
+    own = f'{os.getpid()}.json'
+    snapshots = [registry.snapshot()]
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    for name in os.listdir(directory):
+        if not name.endswith('.json') or name == own:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def merge(snapshots):
+    histograms, counters = {}, {}
+    for snapshot in snapshots:
+        for name, labels, series in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            total = histograms.setdefault(key, [0] * len(series))
+            for number, value in enumerate(series):
+                total[number] += value
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_metrics(snapshots):
+    histograms, counters = merge(snapshots)
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {PREFIX}_{name} {description}')
+        lines.append(f'# TYPE {PREFIX}_{name} histogram')
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, series):
+                cumulative += count
+                lines.append(f'{PREFIX}_{name}_bucket'
+                             f'{format_labels(labels, [("le", bound)])} '
+                             f'{cumulative}')
+            lines.append(f'{PREFIX}_{name}_bucket'
+                         f'{format_labels(labels, [("le", "+Inf")])} '
+                         f'{series[-1]}')
+            lines.append(f'{PREFIX}_{name}_sum{format_labels(labels)} '
+                         f'{series[-2]}')
+            lines.append(f'{PREFIX}_{name}_count{format_labels(labels)} '
+                         f'{series[-1]}')
+    for name, description in COUNTERS.items():
+        lines.append(f'# HELP {PREFIX}_{name} {description}')
+        lines.append(f'# TYPE {PREFIX}_{name} counter')
+        for (series_name, labels), value in sorted(counters.items()):
+            if series_name == name:
+                lines.append(f'{PREFIX}_{name}{format_labels(labels)} '
+                             f'{value}')
+    return '\n'.join(lines) + '\n'
+
+
+def count_queries(execute, sql, params, many, context):
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+def instrument_cache(cache):
+    """Считает попадания в кеш; экземпляр свой у каждого потока."""
+    if getattr(cache, '_metrics', False):
+        return
+    get, get_many = cache.get, cache.get_many
+    missing = object()
+
+    def counted_get(key, default=None, version=None):
+        value = get(key, missing, version=version)
+        stats = current.get()
+        if stats is not None:
+            if value is missing:
+                stats.misses += 1
+            else:
+                stats.hits += 1
+        return default if value is missing else value
+
+    def counted_get_many(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        stats = current.get()
+        if stats is not None:
+            stats.hits += len(found)
+            stats.misses += len(keys) - len(found)
+        return found
+
+    cache.get = counted_get
+    cache.get_many = counted_get_many
+    cache._metrics = True
+
+
+def measured(stats, func, *args):
+    """Вызывает func, относя запросы к базе, кеш и шаблоны к stats."""
+    token = current.set(stats)
+    try:
+        with connection.execute_wrapper(count_queries):
+            return func(*args)
+    finally:
+        current.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    Замеряет запрос целиком, поэтому стоит первым в MIDDLEWARE.
+
+    Потоковый ответ (экспорт) работает с базой, пока отдаётся клиенту,
+    поэтому его метрики записываются, когда поток закончится.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        instrument_cache(caches['default'])
+        stats = RequestStats()
+        started = time.perf_counter()
+        response = measured(stats, self.get_response, request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, stats, started
+            )
+        else:
+            self.record(request, response, stats, started)
+        return response
+
+    def stream(self, content, request, response, stats, started):
+        chunks = iter(content)
+        try:
+            while True:
+                try:
+                    chunk = measured(stats, next, chunks)
+                except StopIteration:
+                    return
+                yield chunk
+        finally:
+            # и когда клиент оборвал загрузку: сервер закроет генератор
+            self.record(request, response, stats, started)
+
+    def record(self, request, response, stats, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = (('view', match.view_name if match else 'unresolved'),)
+        registry.observe('request_duration_seconds', view, duration)
+        registry.observe('db_queries', view, stats.queries)
+        registry.observe('db_duration_seconds', view, stats.db_time)
+        registry.observe('template_render_seconds', view,
+                         stats.template_time)
+        registry.inc('requests_total', view + (
+            ('method', request.method), ('status', response.status_code),
+        ))
+        registry.inc('cache_requests_total', view + (('result', 'hit'),),
+                     stats.hits)
+        registry.inc('cache_requests_total', view + (('result', 'miss'),),
+                     stats.misses)
+        registry.maybe_flush()
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, которые записывают время рендеринга в метрики."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    body = render_metrics(read_snapshots(settings.METRICS_DIR))
+    return HttpResponse(body, content_type='text/plain; version=0.0.4')
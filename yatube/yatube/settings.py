@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,7 +63,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -106,7 +108,16 @@ else:
             'USER': os.getenv('POSTGRES_USER', 'postgres'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
             'HOST': os.getenv('DB_HOST', 'postgres'),
-            'PORT': os.getenv('DB_PORT', '5432')
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # соединение живёт между запросами, а не открывается заново
+            # на каждый; с бэкендом yatube.backends.postgresql — это
+            # время жизни соединения в пуле воркера, см. backends/pool.py
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 300)),
+            'POOL': {
+                'SIZE': int(os.getenv('DB_POOL_SIZE', 4)),
+                'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'CHECK_AFTER': float(os.getenv('DB_POOL_CHECK_AFTER', 10)),
+            },
         }
     }
 
@@ -149,10 +160,17 @@ USE_TZ = False
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# имена с хешем содержимого и сжатые копии, см. yatube/storage.py
+STATICFILES_STORAGE = 'yatube.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Загружаемые файлы всегда пишутся на диск кусками, а не в память
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Login
 
 LOGIN_URL = '/auth/login/'
@@ -164,12 +182,68 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Без CACHE_LOCATION у каждого процесса свой кеш в памяти. На сервере
+# с несколькими воркерами gunicorn кеш кладётся в общий файл, иначе
+# сброс версии ленты в одном воркере не виден остальным
+if os.getenv('CACHE_LOCATION', None) is None:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.SQLiteCache',
+            'LOCATION': os.getenv('CACHE_LOCATION'),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+            },
+        }
     }
-}
 
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
+
+# Ленты подписок: сколько последних постов автора добавлять в ленту
+# при подписке и какими пачками писать записи в таблицу лент.
+# Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+# по лентам не раскладываются, а подмешиваются при чтении
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', 10000))
+TIMELINE_BACKFILL_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 1000
+
+# Сколько секунд хранить отрендеренные карточки постов. Ключ карточки
+# меняется при правке поста, так что срок нужен только для вытеснения
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Миниатюры картинок постов: имя, geometry и опции sorl-thumbnail.
+# Создаются в фоне после сохранения поста, при рендеринге ленты
+# только читаются. Карточка поста показывает миниатюру 'card'
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Сколько фоновых потоков в процессе создают миниатюры. По умолчанию 0:
+# миниатюры нового поста создаются сразу после коммита в том же потоке,
+# что удобно для разработки и тестов, а ленты их не создают вовсе
+# (поможет regenerate_thumbnails); на сервере потоки включаются через .env,
+# а docker-compose.yaml без этой настройки запускает два потока
+POST_THUMBNAIL_WORKERS = int(os.getenv('POST_THUMBNAIL_WORKERS', 0))
+
+# Картинки постов: больше POST_IMAGE_MAX_PIXELS пикселей не принимаем,
+# остальные без метаданных пережимаются в JPEG (с прозрачностью — в PNG)
+# так, чтобы большая сторона была не больше POST_IMAGE_MAX_SIDE. Форматы,
+# которые декодируются только целиком (всё, кроме JPEG), принимаются не
+# больше (2 * POST_IMAGE_MAX_SIDE) ** 2 пикселей (см. posts.uploads)
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2048
+POST_IMAGE_QUALITY = 80
+
+# Метрики для Prometheus на /metrics/. Воркеры раз в
+# METRICS_FLUSH_INTERVAL секунд сбрасывают свои метрики в METRICS_DIR,
+# без него страница показывает только метрики ответившего процесса.
+# С METRICS_TOKEN страница требует заголовок Authorization: Bearer <токен>
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
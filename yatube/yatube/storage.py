@@ -0,0 +1,123 @@
+"""
+Хранилище статики с хешами в именах и заранее сжатыми копиями.
+
+collectstatic кладёт каждый файл дважды: под исходным именем и под
+именем с хешем содержимого (site.css -> site.1f2e3d4c5b6a.css),
+а {% static %} ссылается на второе. Такой файл никогда не меняется,
+поэтому nginx отдаёт его с Cache-Control: immutable, см.
+nginx/default.conf.
+
+После этого текстовые файлы сжимаются в gzip и, если установлен
+пакет Brotli, в brotli рядом с оригиналом (site.css.gz, site.css.br),
+параллельно в нескольких потоках: zlib и brotli отпускают GIL на время
+сжатия. nginx отдаёт готовые копии через gzip_static, ничего
+не сжимая на лету. Уже сжатые копии, которые не старше оригинала,
+при повторном collectstatic не пересжимаются.
+"""
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.xml',
+                '.html', '.ico', '.eot', '.ttf', '.otf')
+# маленькие файлы сжимать незачем: заголовки ответа весят больше
+MIN_SIZE = 256
+
+
+SUFFIXES = ('.gz', '.br')
+
+
+def compressors():
+    variants = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda data: brotli.compress(data)))
+    return variants
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def fresh(target, mtime):
+    try:
+        return os.stat(target).st_mtime >= mtime
+    except FileNotFoundError:
+        return False
+
+
+def compress_file(path):
+    """
+    Пишет сжатые копии файла, возвращает их число.
+
+    Копии от прошлой версии файла, которые больше не нужны (файл стал
+    маленьким или сжимается плохо), удаляются, иначе nginx продолжил
+    бы отдавать по ним старое содержимое.
+    """
+    stat = os.stat(path)
+    if stat.st_size < MIN_SIZE:
+        for suffix in SUFFIXES:
+            remove(path + suffix)
+        return 0
+    available = dict(compressors())
+    data = None
+    written = 0
+    for suffix in SUFFIXES:
+        target = path + suffix
+        if fresh(target, stat.st_mtime):
+            continue
+        compress = available.get(suffix)
+        if compress is None:
+            # пересжать нечем (нет пакета Brotli)
+            remove(target)
+            continue
+        if data is None:
+            with open(path, 'rb') as file:
+                data = file.read()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            remove(target)
+            continue
+        # через временный файл, чтобы nginx не отдал копию наполовину
+        with open(target + '.tmp', 'wb') as file:
+            file.write(compressed)
+        os.replace(target + '.tmp', target)
+        written += 1
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # None — по числу процессоров
+    workers = None
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.add(name)
+                names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        targets = [self.path(name) for name in sorted(names)
+                   if name.lower().endswith(COMPRESSIBLE)]
+        with ThreadPoolExecutor(self.workers) as pool:
+            self.compressed = sum(pool.map(compress_file, targets))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # статику ещё не собирали (тесты, разработка): ссылаемся
+            # на исходное имя, его отдаёт и runserver
+            return name
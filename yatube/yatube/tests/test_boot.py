@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from posts.models import Post
+from yatube.boot import SKIPPED, boot
+
+
+class BootTests(TransactionTestCase):
+    # загрузка дампа идёт в отдельном потоке и коммитит свою транзакцию
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        self.addCleanup(shutil.rmtree, self.source)
+        with open(os.path.join(self.source, 'site.css'), 'w') as file:
+            file.write('body { color: black; }')
+        static = override_settings(STATIC_ROOT=self.static_root,
+                                   STATICFILES_DIRS=[self.source])
+        static.enable()
+        self.addCleanup(static.disable)
+
+    def results(self, **options):
+        return {name: result for name, result, _ in boot(**options)}
+
+    def test_second_boot_skips_everything(self):
+        first = self.results()
+        self.assertNotEqual(first['collectstatic'], SKIPPED)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.static_root, 'site.css')
+        ))
+        # тестовая база уже со всеми миграциями
+        self.assertEqual(first['migrate'], SKIPPED)
+        self.assertEqual(self.results(),
+                         {'collectstatic': SKIPPED, 'migrate': SKIPPED})
+
+    def test_changed_or_lost_static_is_collected_again(self):
+        self.results()
+        source = os.path.join(self.source, 'site.css')
+        with open(source, 'w') as file:
+            file.write('body { color: red; }')
+        # collectstatic сравнивает время изменения с точностью до секунды
+        stat = os.stat(source)
+        os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+        self.assertNotEqual(self.results()['collectstatic'], SKIPPED)
+        with open(os.path.join(self.static_root, 'site.css')) as file:
+            self.assertIn('red', file.read())
+        # пустой том статики: отпечатка сборки больше нет
+        shutil.rmtree(self.static_root)
+        os.makedirs(self.static_root)
+        self.assertNotEqual(self.results()['collectstatic'], SKIPPED)
+
+    def test_dump_is_loaded_once(self):
+        dump = os.path.join(settings.BASE_DIR, 'dump.json')
+        self.assertNotEqual(self.results(dump=dump)['import_dump'], SKIPPED)
+        self.assertTrue(Post.objects.exists())
+        self.assertEqual(self.results(dump=dump)['import_dump'], SKIPPED)
+
+    def test_command_reports_phases(self):
+        output = StringIO()
+        call_command('boot', stdout=output)
+        for phase in ('collectstatic', 'migrate', 'Готово'):
+            self.assertIn(phase, output.getvalue())
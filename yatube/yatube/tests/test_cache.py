@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.test import SimpleTestCase
+
+from yatube.cache import SQLiteCache
+
+
+def read_from_child(path, queue):
+    queue.put(SQLiteCache(path, {}).get('shared'))
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2},
+        })
+
+    def test_basic_operations(self):
+        """Кеш поддерживает операции, на которые опираются ленты"""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 1))
+        self.assertEqual(self.cache.incr('new'), 2)
+        self.assertEqual(self.cache.get_many(['key', 'new', 'missing']),
+                         {'key': {'value': 1}, 'new': 2})
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('new'))
+
+    def test_expired_entries_are_not_returned(self):
+        """Просроченные записи не читаются и уступают место add"""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.05)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+        self.assertEqual(self.cache.get('key'), 'fresh')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """При переполнении вытесняются давно не читанные записи"""
+        for number in range(10):
+            self.cache.set(f'key{number}', number)
+        self.cache._db.execute('UPDATE cache SET accessed = 0')
+        self.cache.get('key0')
+        self.cache.set('key10', 10)
+        self.cache._cull(self.cache._db)
+        self.assertEqual(self.cache.get('key0'), 0)
+        self.assertEqual(self.cache.get('key10'), 10)
+        self.assertLess(len(self.cache.get_many(
+            [f'key{number}' for number in range(11)]
+        )), 11)
+
+    def test_other_processes_see_the_same_entries(self):
+        """Записи видны другим процессам"""
+        self.cache.set('shared', 'value')
+        context = get_context('spawn')
+        queue = context.Queue()
+        process = context.Process(target=read_from_child,
+                                  args=(self.path, queue))
+        process.start()
+        process.join()
+        self.assertEqual(queue.get(timeout=5), 'value')
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.db.utils import load_backend
+from django.test import SimpleTestCase
+
+from yatube.backends.pool import ConnectionPool, PoolTimeout, pools
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def pool(self, **options):
+        self.connects = 0
+
+        def connect():
+            self.connects += 1
+            return FakeConnection()
+        options.setdefault('size', 2)
+        return ConnectionPool(**options), connect
+
+    def test_released_connection_is_reused(self):
+        pool, connect = self.pool()
+        first = pool.acquire(connect)
+        pool.release(first)
+        self.assertIs(pool.acquire(connect), first)
+        self.assertEqual(self.connects, 1)
+
+    def test_size_limits_open_connections(self):
+        pool, connect = self.pool(size=1, timeout=0.05)
+        connection = pool.acquire(connect)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(connect)
+        # освободившееся соединение достаётся ждущему потоку
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(
+            pool.acquire(connect)
+        ))
+        pool.timeout = 5
+        waiter.start()
+        pool.release(connection)
+        waiter.join()
+        self.assertEqual(got, [connection])
+        self.assertEqual(self.connects, 1)
+
+    def test_idle_connection_is_checked(self):
+        checked = []
+
+        def check(connection):
+            checked.append(connection)
+            return False
+        pool, connect = self.pool(check_after=0, check=check)
+        broken = pool.acquire(connect)
+        pool.release(broken)
+        fresh = pool.acquire(connect)
+        self.assertEqual(checked, [broken])
+        self.assertTrue(broken.closed)
+        self.assertIsNot(fresh, broken)
+
+    def test_old_and_broken_connections_are_closed(self):
+        pool, connect = self.pool(max_age=0)
+        old = pool.acquire(connect)
+        pool.release(old)
+        self.assertTrue(old.closed)
+        pool.max_age = None
+        broken = pool.acquire(connect)
+        pool.release(broken, discard=True)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.idle, [])
+
+    def test_failed_connect_frees_the_slot(self):
+        pool, _ = self.pool(size=1, timeout=0.05)
+
+        def fail():
+            raise OSError('нет связи')
+        with self.assertRaises(OSError):
+            pool.acquire(fail)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
+
+
+class PooledBackendTests(SimpleTestCase):
+    def test_connection_returns_to_pool_after_request(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        backend = load_backend('yatube.backends.sqlite3')
+        settings_dict = {
+            'NAME': os.path.join(directory, 'pool.sqlite3'),
+            'CONN_MAX_AGE': 300, 'OPTIONS': {}, 'AUTOCOMMIT': True,
+            'ATOMIC_REQUESTS': False, 'TIME_ZONE': None, 'TEST': {},
+            'POOL': {'SIZE': 1},
+        }
+        wrapper = backend.DatabaseWrapper(settings_dict, alias='pool_test')
+        self.addCleanup(pools.clear)
+        physical = set()
+        for _ in range(3):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            physical.add(id(wrapper.connection))
+            # так Django завершает каждый запрос
+            wrapper.close_if_unusable_or_obsolete()
+            self.assertIsNone(wrapper.connection)
+        self.assertEqual(len(physical), 1)
@@ -0,0 +1,128 @@
+import json
+import os
+import re
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import metrics
+
+User = get_user_model()
+
+
+def sample(body, name, **labels):
+    """Значение одной серии из ответа /metrics/."""
+    for line in body.splitlines():
+        match = re.match(r'(\w+)(?:\{(.*)\})? (\S+)$', line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ''))
+        if found == {key: str(value) for key, value in labels.items()}:
+            return float(match.group(3))
+    return None
+
+
+@override_settings(METRICS_DIR=None, METRICS_TOKEN=None)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='text', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = Client()
+
+    def metrics(self, **headers):
+        return self.client.get(reverse('metrics'), **headers)
+
+    def test_requests_are_measured_per_view(self):
+        """Время, запросы к базе и шаблоны считаются по имени маршрута"""
+        url = reverse('post', args=[MetricsTests.user.username,
+                                    MetricsTests.post.pk])
+        self.client.get(url)
+        self.client.get(url)
+        body = self.metrics().content.decode()
+        self.assertEqual(sample(body, 'yatube_request_duration_seconds_count',
+                                view='post'), 2)
+        self.assertEqual(sample(body, 'yatube_requests_total', view='post',
+                                method='GET', status=200), 2)
+        self.assertGreater(sample(body, 'yatube_db_queries_sum',
+                                  view='post'), 0)
+        self.assertGreater(sample(body, 'yatube_db_duration_seconds_sum',
+                                  view='post'), 0)
+        self.assertGreater(sample(body, 'yatube_template_render_seconds_sum',
+                                  view='post'), 0)
+        self.assertEqual(sample(body, 'yatube_db_queries_bucket',
+                                view='post', le='+Inf'), 2)
+
+    def test_streaming_response_is_measured_when_finished(self):
+        """Экспорт замеряется вместе с запросами, сделанными при отдаче"""
+        self.client.force_login(MetricsTests.user)
+        response = self.client.get(
+            reverse('export_posts', args=[MetricsTests.user.username])
+        )
+        body = self.metrics().content.decode()
+        self.assertIsNone(sample(body, 'yatube_requests_total',
+                                 view='export_posts', method='GET',
+                                 status=200))
+        content = b''.join(response.streaming_content)
+        self.assertIn(b'text', content)
+        body = self.metrics().content.decode()
+        self.assertEqual(sample(body, 'yatube_requests_total',
+                                view='export_posts', method='GET',
+                                status=200), 1)
+        self.assertGreater(sample(body, 'yatube_db_queries_sum',
+                                  view='export_posts'), 0)
+
+    def test_cache_hits_and_misses(self):
+        """Повторный запрос главной попадает в кеш"""
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        body = self.metrics().content.decode()
+        self.assertGreater(sample(body, 'yatube_cache_requests_total',
+                                  view='index', result='miss'), 0)
+        self.assertGreater(sample(body, 'yatube_cache_requests_total',
+                                  view='index', result='hit'), 0)
+
+    def test_unresolved_paths_share_one_label(self):
+        """Несуществующие адреса не плодят серии"""
+        self.client.get('/group/missing/nothing/')
+        self.client.get('/group/other/nothing/')
+        body = self.metrics().content.decode()
+        self.assertEqual(sample(body, 'yatube_requests_total',
+                                view='unresolved', method='GET',
+                                status=404), 2)
+
+    def test_workers_are_merged(self):
+        """Страница складывает метрики всех воркеров из METRICS_DIR"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        other = metrics.Registry()
+        other.inc('requests_total', (('view', 'index'), ('method', 'GET'),
+                                     ('status', 200)), 5)
+        with open(os.path.join(directory.name, '1.json'), 'w') as file:
+            json.dump(other.snapshot(), file)
+        self.client.get(reverse('index'))
+        with override_settings(METRICS_DIR=directory.name):
+            body = self.metrics().content.decode()
+        self.assertEqual(sample(body, 'yatube_requests_total', view='index',
+                                method='GET', status=200), 6)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required(self):
+        """С METRICS_TOKEN метрики отдаются только с токеном"""
+        self.assertEqual(self.metrics().status_code, 403)
+        response = self.metrics(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
@@ -0,0 +1,100 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from yatube import storage
+
+CSS = '.logo { background: url("logo.png"); }\n' + '.a { color: red; }\n' * 50
+
+
+class StaticStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        self.addCleanup(shutil.rmtree, self.source)
+        with open(os.path.join(self.source, 'site.css'), 'w') as file:
+            file.write(CSS)
+        with open(os.path.join(self.source, 'logo.png'), 'wb') as file:
+            file.write(b'\x89PNG' + b'\0' * 1000)
+        static = override_settings(STATIC_ROOT=self.static_root,
+                                   STATICFILES_DIRS=[self.source],
+                                   INSTALLED_APPS=[
+                                       'django.contrib.staticfiles'
+                                   ])
+        static.enable()
+        self.addCleanup(static.disable)
+
+    def collect(self):
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+
+    def collected(self, name):
+        with open(os.path.join(self.static_root, name), 'rb') as file:
+            return file.read()
+
+    def test_hashed_names_in_templates(self):
+        self.collect()
+        url = Template('{% load static %}{% static "site.css" %}').render(
+            Context()
+        )
+        name = url[len('/static/'):]
+        self.assertRegex(name, r'^site\.[0-9a-f]{12}\.css$')
+        # ссылки внутри CSS тоже ведут на файлы с хешем
+        self.assertRegex(self.collected(name).decode(),
+                         r'url\("logo\.[0-9a-f]{12}\.png"\)')
+
+    def test_compressed_copies(self):
+        self.collect()
+        name = staticfiles_storage.stored_name('site.css')
+        content = self.collected(name)
+        self.assertEqual(gzip.decompress(self.collected(name + '.gz')),
+                         content)
+        if storage.brotli is not None:
+            self.assertEqual(
+                storage.brotli.decompress(self.collected(name + '.br')),
+                content,
+            )
+        # картинки и так сжаты
+        png = staticfiles_storage.stored_name('logo.png')
+        self.assertFalse(os.path.exists(
+            os.path.join(self.static_root, png + '.gz')
+        ))
+
+    def test_unchanged_files_are_not_compressed_again(self):
+        self.collect()
+        path = os.path.join(self.static_root, 'site.css.gz')
+        mtime = os.stat(path).st_mtime_ns
+        self.collect()
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+    def test_stale_copies_are_removed(self):
+        self.collect()
+        path = os.path.join(self.static_root, 'site.css')
+        # файл стал слишком маленьким, чтобы его сжимать
+        with open(os.path.join(self.source, 'site.css'), 'w') as file:
+            file.write('.a { color: red; }\n')
+        # collectstatic сравнивает время правки с точностью до секунды
+        later = os.stat(path).st_mtime + 10
+        os.utime(os.path.join(self.source, 'site.css'), (later, later))
+        self.collect()
+        self.assertFalse(os.path.exists(path + '.gz'))
+        self.assertFalse(os.path.exists(path + '.br'))
+        # и сжатая копия, которая не меньше оригинала
+        with open(path, 'wb') as file:
+            file.write(os.urandom(storage.MIN_SIZE * 4))
+        with open(path + '.gz', 'wb') as file:
+            file.write(b'stale')
+        os.utime(path + '.gz', (0, 0))
+        storage.compress_file(path)
+        self.assertFalse(os.path.exists(path + '.gz'))
+
+    def test_uncollected_static_keeps_plain_name(self):
+        self.assertEqual(staticfiles_storage.url('site.css'),
+                         '/static/site.css')